@@ -1,19 +1,36 @@
 import streamlit as st
-from supabase import create_client, Client
+from supabase import Client
 from datetime import datetime, timedelta
 import os
+import tempfile
 import uuid
 import pandas as pd
-import openai
 from dotenv import load_dotenv
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_community.vectorstores import SupabaseVectorStore
-from integration_debugger import patch_supabase_client, show_integration_log, _log_lock, _integration_log
+from integration_debugger import show_integration_log, show_query_metrics
+from poppy import resources
+from poppy import query_middleware
+from poppy.integration_log import log_event
+from poppy.query_metrics import begin_rerun
+from poppy.embedding_cache import get_embedding_cache
+from poppy.sprint_metrics import get_sprint_metrics, completion_ratio
+from poppy.item_store import edge_rank, resolve_filters, load_snapshot, load_pagers, live_items, affected_statuses
+from poppy.change_feed import change_feed, start_change_feed
+from poppy.reference_data import reference_data, LookupTable
+from poppy.prefetch import prefetch
+from poppy.bulk_ops import diff_ranks, bulk_update_ranks, bulk_delete_items, bulk_update_status
+from poppy.ranking import move_item, move_neighbours, ranks_above, ranks_below, ranks_drifted, schedule_rebalance
+from poppy.ai_rerank import RerankJob
+from poppy.importer import import_file
+from poppy.export import EXPORT_FORMATS, MIME_TYPES, export_items
+from poppy.rag import RagService
 import time
 
 # --- Load .env for local development ---
 load_dotenv()
 
+# Group every timed call of this script run for the latency panel
+begin_rerun("app_enhanced")
+
 # --- Page config
 st.set_page_config(page_title="Poppy Ideation", layout="wide")
 
@@ -91,8 +108,8 @@ try:
     if SUPABASE_URL == "NOT_FOUND" or SUPABASE_KEY == "NOT_FOUND":
         st.error("Could not find Supabase credentials in secrets or .env")
         st.stop()
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-    patch_supabase_client(supabase)
+    # Shared across sessions; instrumented once when first created
+    supabase: Client = resources.get_supabase_client(SUPABASE_URL, SUPABASE_KEY, instrument=query_middleware.instrument)
 except Exception as e:
     st.error(f"Error loading secrets: {str(e)}")
     st.stop()
@@ -115,41 +132,16 @@ def get_sprint_status(sprint):
 
 def get_sprint_points(sprint_id):
     """Get total points for a sprint"""
-    items = supabase.table("sprint_backlog")\
-        .select("backlog_item_id")\
-        .eq("sprint_id", sprint_id)\
-        .execute().data
-    
-    points = 0
-    for item in items:
-        backlog_item = supabase.table("backlog_items")\
-            .select("points")\
-            .eq("id", item['backlog_item_id'])\
-            .execute().data[0]
-        points += backlog_item['points']
-    return points
+    return get_sprint_metrics(supabase, [sprint_id])[str(sprint_id)]["total_points"]
 
 def get_sprint_velocity(sprint_id):
     """Calculate sprint velocity"""
-    completed_items = supabase.table("sprint_backlog")\
-        .select("backlog_item_id")\
-        .eq("sprint_id", sprint_id)\
-        .eq("status", "done")\
-        .execute().data
-    
-    velocity = 0
-    for item in completed_items:
-        backlog_item = supabase.table("backlog_items")\
-            .select("points")\
-            .eq("id", item['backlog_item_id'])\
-            .execute().data[0]
-        velocity += backlog_item['points']
-    return velocity
+    return get_sprint_metrics(supabase, [sprint_id])[str(sprint_id)]["completed_points"]
 
 # --- Global variable initializations for filters and lookups (will be populated in sidebar)
 status_lookup = {} 
 priority_lookup = {}
-category_lookup = {}
+category_lookup = None
 selected_status_id = None
 selected_priority_id = None
 selected_category_id = None
@@ -161,24 +153,81 @@ priority_options_list = ["low", "medium", "high", "urgent"]
 category_names = []
 current_sprint = None # Initialize current_sprint globally
 
+# "snapshot" loads every tab in one query; "paginated" loads one keyset page per tab
+ITEM_LISTING = os.environ.get("ITEM_LISTING", "snapshot")
+PAGINATED = ITEM_LISTING == "paginated"
+
+# Other sessions' writes arrive through one change feed per process (poppy/change_feed.py):
+# "realtime" (falls back to polling updated_at), "poll" or "off"
+CHANGE_FEED = os.environ.get("CHANGE_FEED", "realtime")
+start_change_feed(supabase, SUPABASE_URL, SUPABASE_KEY, mode=CHANGE_FEED)
+feed = change_feed if change_feed.running else None
+# Snapshot tabs are rebuilt from the shared in-memory rows; pages are re-queried
+live = live_items if feed is not None and not PAGINATED else None
+
+def invalidate_items(*statuses):
+    """Mark item snapshot partitions / pages stale after a write (all if none given)"""
+    snapshot = st.session_state.get("item_snapshot")
+    if snapshot is not None:
+        snapshot.invalidate(*statuses)
+    pagers = st.session_state.get("item_pagers") or {}
+    for status in statuses or list(pagers):
+        if status in pagers:
+            pagers[status].invalidate()
+
+def get_item_snapshot(filters):
+    """Session-scoped items snapshot for the current filters, refreshed if stale"""
+    snapshot = st.session_state.item_snapshot = load_snapshot(supabase, st.session_state.get("item_snapshot"), filters, feed, live)
+    return snapshot
+
+# --- Prefetch: issue the independent reads for this run in parallel
+# Widget values are already in session_state at the start of a rerun
+_selection = (
+    st.session_state.get("priority_select", "All"),
+    st.session_state.get("category_select", "All"),
+    st.session_state.get("sprint_select", st.session_state.get("selected_sprint", "All")),
+)
+_items_key = "item_pagers" if PAGINATED else "item_snapshot"
+_current_items = st.session_state.get(_items_key)
+prefetched, prefetch_errors = prefetch({
+    "categories": lambda: reference_data.get(supabase, "categories"),
+    "sprints": lambda: reference_data.get(supabase, "sprints"),
+    # Runs on a worker thread: no session_state access in here
+    "items": lambda: (
+        load_pagers(supabase, _current_items, resolve_filters(supabase, *_selection), feed) if PAGINATED
+        else load_snapshot(supabase, _current_items, resolve_filters(supabase, *_selection), feed, live)
+    ),
+})
+for _name, _error in prefetch_errors.items():
+    log_event('ERROR', f"Prefetch {_name}: {_error}", table=_name, operation="prefetch")
+if "items" in prefetched:
+    st.session_state[_items_key] = prefetched["items"]
+else:
+    # A timed-out worker may still be refreshing the old items; don't share them
+    st.session_state.pop(_items_key, None)
+
 # --- Sidebar
 with st.sidebar:
     st.header("Filters")
-    # Fetch categories, priorities, statuses, sprints
-    categories_response = supabase.table("categories").select("id", "name").execute()
-    category_options_data = categories_response.data if categories_response.data else []
-    category_names = [c["name"] for c in category_options_data]
+    # Lookup tables come from the shared TTL cache (see poppy/reference_data.py), loaded by the prefetch
+    if "categories" in prefetch_errors:
+        st.warning(f"Could not load categories: {prefetch_errors['categories']}")
+    category_lookup = prefetched.get("categories", LookupTable([]))
+    category_options_data = category_lookup.rows
+    category_names = category_lookup.names()
 
     priorities = ["low", "medium", "high", "urgent"]
     statuses = ["idea", "backlog", "in_progress", "done", "blocked"]
 
-    selected_priority = st.selectbox("Priority", ["All"] + priorities)
-    selected_category = st.selectbox("Category", ["All"] + category_names)
+    selected_priority = st.selectbox("Priority", ["All"] + priorities, key="priority_select")
+    selected_category = st.selectbox("Category", ["All"] + category_names, key="category_select")
 
     # Sprints
-    sprints_response = supabase.table("sprints").select("id", "name", "start_date", "end_date", "status", "goal").execute()
-    sprints = sprints_response.data if sprints_response.data else []
-    sprint_names = [s["name"] for s in sprints]
+    if "sprints" in prefetch_errors:
+        st.warning(f"Could not load sprints: {prefetch_errors['sprints']}")
+    sprint_lookup = prefetched.get("sprints", LookupTable([]))
+    sprints = sprint_lookup.rows
+    sprint_names = sprint_lookup.names()
 
     # Use session_state for selected sprint
     if "selected_sprint" not in st.session_state:
@@ -203,6 +252,7 @@ with st.sidebar:
                         "status": "planned",
                         "goal": goal
                     }).execute()
+                    reference_data.invalidate("sprints")
                     st.success("Sprint created!")
                     # Auto-select the new sprint
                     st.session_state.selected_sprint = sprint_name
@@ -242,6 +292,8 @@ with st.sidebar:
                                     "status": new_status,
                                     "goal": new_goal
                                 }).eq("id", row["id"]).execute()
+                                reference_data.invalidate("sprints")
+                                invalidate_items()
                                 st.success("Sprint updated!")
                                 st.rerun()
                             except Exception as e:
@@ -249,6 +301,8 @@ with st.sidebar:
                         if delete:
                             try:
                                 supabase.table("sprints").delete().eq("id", row["id"]).execute()
+                                reference_data.invalidate("sprints")
+                                invalidate_items()
                                 st.success("Sprint deleted!")
                                 st.rerun()
                             except Exception as e:
@@ -273,27 +327,34 @@ with st.sidebar:
     if not OPENAI_API_KEY:
         st.error("OpenAI API key not found in secrets. Please add it to use AI features.")
         st.stop()
-    openai.api_key = OPENAI_API_KEY
     # --- End AI/RAG Secrets Check ---
 
+    cache_stats = get_embedding_cache().stats()
+    st.caption(
+        f"Embedding cache: {cache_stats['size']} vectors, "
+        f"{cache_stats['hits']} hits / {cache_stats['misses']} misses"
+    )
+    ref_stats = reference_data.stats()
+    st.caption(
+        f"Lookup cache: {ref_stats['hits']} hits / {ref_stats['misses']} misses "
+        f"(TTL {ref_stats['ttl']:.0f}s)"
+    )
+    feed_stats = change_feed.stats()
+    if feed_stats["source"]:
+        st.caption(f"Change feed: {feed_stats['source']}, {feed_stats['events']} changes, {ref_stats['patches']} lookup patches")
+
     show_integration_log()
+    show_query_metrics()
 
 # --- RAG Q&A Setup ---
-def get_vectorstore(supabase_url, supabase_key, openai_api_key):
-    embeddings = OpenAIEmbeddings(openai_api_key=openai_api_key)
-    client = create_client(supabase_url, supabase_key)
-    return SupabaseVectorStore(
-        client=client,
-        embedding=embeddings,
-        table_name="idea_embeddings",  # You may need to create this table in Supabase
-    )
+# Retrieval, answer cache and pooled clients live in poppy.rag; LangChain loads on first use
+rag = RagService(SUPABASE_URL, SUPABASE_KEY, OPENAI_API_KEY, instrument=query_middleware.instrument)
 
-def ensure_idea_embeddings(vectorstore, ideas):
-    # Check if embeddings exist for all ideas, add if missing
-    ids = [str(idea["id"]) for idea in ideas]
-    texts = [f"{idea['title']}. {idea['description']}" for idea in ideas]
-    # This will upsert embeddings for all ideas
-    vectorstore.add_texts(texts, ids=ids)
+# Embeddings are kept up to date by poppy.embedding_sync (delta sync on content hash).
+# Set EMBEDDING_SYNC_INTERVAL=0 when running `python -m poppy.embedding_sync` as a separate job.
+EMBEDDING_SYNC_INTERVAL = int(os.environ.get("EMBEDDING_SYNC_INTERVAL", "300"))
+if EMBEDDING_SYNC_INTERVAL > 0:
+    rag.start_sync(EMBEDDING_SYNC_INTERVAL)
 
 # --- Sprint Details Card ---
 def show_sprint_details(selected_sprint_name, sprints):
@@ -306,110 +367,242 @@ def show_sprint_details(selected_sprint_name, sprints):
             st.write(f"**Status:** {sprint['status']}")
             if sprint.get("goal"):
                 st.write(f"**Goal:** {sprint['goal']}")
-            # Optionally, add metrics here (points, velocity, etc.)
+            try:
+                metrics = get_sprint_metrics(supabase, [sprint["id"]])[str(sprint["id"])]
+            except Exception as e:
+                st.warning(f"Could not load sprint metrics: {str(e)}")
+                return
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Points", metrics["total_points"])
+            col2.metric("Velocity (done points)", metrics["completed_points"])
+            col3.metric("Items done", f"{metrics['completed_count']} / {metrics['item_count']}")
+            st.progress(completion_ratio(metrics))
+
+# --- AI Chat helpers ---
+# AI_CHAT_STREAMING=0 falls back to a blocking invoke followed by a rerun
+AI_CHAT_STREAMING = os.environ.get("AI_CHAT_STREAMING", "1") != "0"
+
+def render_chat_message(user_msg, ai_msg, cached=False):
+    st.markdown(f"<div style='margin-bottom:0.5em;'><b>You:</b> {user_msg}</div>", unsafe_allow_html=True)
+    render_ai_message(st, ai_msg, cached)
+
+def render_ai_message(container, ai_msg, cached=False):
+    badge = " <span class='status-badge status-done'>cached answer</span>" if cached else ""
+    container.markdown(f"<div style='background:#E9ECEF;padding:1em;border-radius:10px;margin-bottom:1.5em;'><b>AI:</b>{badge} {ai_msg}</div>", unsafe_allow_html=True)
+
+def show_rerank_progress(status):
+    """Progress and cancel for a running AI re-rank; reruns the app once it finishes"""
+    job = st.session_state.get(f"rerank_job_{status}")
+    if job is None:
+        return
+    if job.running:
+        label = "Loading items..." if job.state == "loading" else f"Scoring {job.done}/{job.total} items ({job.cached} cached)"
+        st.progress(job.done / job.total if job.total else 0.0, text=label)
+        if st.button("Cancel Re-Rank", key=f"cancel_rerank_{status}"):
+            job.cancel()
+        return
+    st.session_state.pop(f"rerank_job_{status}")
+    if job.state == "done":
+        invalidate_items(status)
+        result = job.result
+        notice = ("success", f"Re-ranked {result['items']} items ({result['scored']} scored, {result['cached']} cached, {result['updated']} ranks changed) in {result['seconds']:.1f}s")
+    elif job.state == "cancelled":
+        notice = ("warning", f"Re-rank cancelled after {job.done} of {job.total} items; scores so far are cached")
+    else:
+        log_event('ERROR', f"AI re-rank {status}: {job.error}", table="items", operation="rerank")
+        notice = ("error", f"AI re-rank failed: {job.error}")
+    st.session_state[f"rerank_notice_{status}"] = notice
+    st.rerun()
+
+# Polls the background job once a second without rerunning the whole page
+poll_rerank_progress = st.fragment(run_every=1)(show_rerank_progress)
+
+def watch_changes(filters):
+    """Rerun the page only when the change feed touched what it shows"""
+    items = st.session_state.get(_items_key)
+    if feed is None or items is None:
+        return
+    seen = min(pager.seq for pager in items.values()) if PAGINATED else items.seq
+    _, changes, complete = feed.changes_since(seen)
+    sprint_changed = st.session_state.selected_sprint != "All" and any(change.table == "sprint_backlog" for change in changes)
+    if sprint_changed or affected_statuses(changes, filters, complete):
+        st.rerun()
+
+# In-memory check every few seconds; no queries unless something relevant changed
+CHANGE_FEED_REFRESH = float(os.environ.get("CHANGE_FEED_REFRESH", "2"))
+poll_changes = st.fragment(run_every=CHANGE_FEED_REFRESH or None)(watch_changes)
 
 st.title("Poppy Ideation")
 
 # --- Main Layout Sections ---
+# The download is served from memory, so larger exports are refused (use python -m poppy.export)
+EXPORT_DOWNLOAD_MAX_ROWS = int(os.environ.get("EXPORT_DOWNLOAD_MAX_ROWS", "50000"))
+
+
+def build_export(fmt, filters, since=None):
+    """Download button callback; the finished file is returned as bytes, so it is held in memory while served"""
+    with tempfile.TemporaryFile() as f:
+        try:
+            stats = export_items(supabase, f, fmt, filters, since=since, max_rows=EXPORT_DOWNLOAD_MAX_ROWS)
+        except Exception as e:
+            log_event('ERROR', f"Export {fmt}: {e}", table="items", operation="export")
+            raise
+        log_event('EXPORT', f"Exported {stats['rows']} items as {fmt} in {stats['seconds']:.1f}s", table="items", operation="export", row_count=stats["rows"], byte_size=f.tell())
+        f.seek(0)
+        return f.read()
+
+
+def display_item_forms(filters, statuses):
+    """Add Item, Bulk Import and Export; independent of the items prefetch"""
+    with st.form("add_edit_item_form", clear_on_submit=True):
+        title = st.text_input("Title")
+        description = st.text_area("Description")
+        form_status = st.selectbox("Status", statuses, index=0)
+        priority = st.selectbox("Priority", priorities)
+        category = st.selectbox("Category", category_names)
+        points = st.number_input("Points", min_value=0, max_value=100, value=0)
+        submitted = st.form_submit_button("Add Item")
+        if submitted and title:
+            category_id = category_lookup.id_for(category)
+            supabase.table("items").insert({
+                "title": title,
+                "description": description,
+                "status": form_status,
+                "priority": priority,
+                "category_id": category_id,
+                "points": points
+            }).execute()
+            invalidate_items(form_status)
+            st.success("Item added!")
+            # Switch to the tab matching the new item's status
+            st.query_params["tab"] = form_status
+            st.rerun()
+
+    with st.expander("Bulk Import (CSV, YAML, PDF)"):
+        st.caption("CSV/YAML fields: title, description, status, priority, category, points. PDF: one idea per bullet or numbered line.")
+        upload = st.file_uploader("Ideas file", type=["csv", "yaml", "yml", "pdf"], key="bulk_import_file")
+        if upload is not None and st.button("Import", key="bulk_import_button"):
+            progress = st.progress(0.0, text="Importing...")
+            def on_progress(stats):
+                progress.progress(min(upload.tell() / max(upload.size, 1), 1.0), text=f"{stats['inserted']} inserted, {stats['skipped']} skipped")
+            try:
+                embeddings = rag.embeddings() if OPENAI_API_KEY else None
+                stats = import_file(supabase, upload, upload.name, embeddings, on_progress=on_progress)
+            except Exception as e:
+                log_event('ERROR', f"Bulk import {upload.name}: {e}", table="items", operation="import")
+                # Chunks inserted before the failure are committed
+                invalidate_items()
+                st.error(f"Import failed: {e}")
+            else:
+                progress.progress(1.0, text="Done")
+                invalidate_items(*stats["statuses"])
+                st.success(f"Imported {stats['inserted']} items ({stats['embedded']} embedded, {stats['skipped']} skipped) in {stats['seconds']:.1f}s ({stats['rows_per_second']:.0f} rows/s)")
+                for error in stats["errors"]:
+                    st.caption(f"Skipped {error}")
+
+    with st.expander("Export (CSV, JSONL, Parquet)"):
+        st.caption(f"All statuses with category and sprint names, under the sidebar filters. The file is built when you click Download and held in memory while it is served, so downloads of more than {EXPORT_DOWNLOAD_MAX_ROWS:,} items fail; export those with `python -m poppy.export`.")
+        export_fmt = st.selectbox("Format", EXPORT_FORMATS, key="export_format")
+        export_since = None
+        if st.checkbox("Only items updated since", key="export_incremental"):
+            since_date = st.date_input("Updated since", value=datetime.now().date() - timedelta(days=1), key="export_since")
+            export_since = datetime.combine(since_date, datetime.min.time()).astimezone().isoformat()
+        st.download_button(
+            "Download", lambda: build_export(export_fmt, filters, export_since),
+            file_name=f"items-{datetime.now():%Y%m%d-%H%M}.{export_fmt}", mime=MIME_TYPES[export_fmt],
+            key="export_download", on_click="ignore",
+        )
+
+
 def display_main_content():
     show_sprint_details(st.session_state.selected_sprint, sprints)
+    # Sidebar filters, shared by the item tabs and local retrieval
+    filters = {"priority": None, "category_id": None, "sprint_id": None}
+    if selected_priority != "All":
+        filters["priority"] = selected_priority
+    if selected_category != "All":
+        filters["category_id"] = category_lookup.id_for(selected_category)
+    if selected_sprint != "All":
+        filters["sprint_id"] = sprint_lookup.id_for(selected_sprint)
+    if feed is not None and CHANGE_FEED_REFRESH > 0 and "items" not in prefetch_errors:
+        poll_changes(filters)
     # AI Chat (RAG Q&A)
     st.markdown("---")
     st.subheader(":mag: AI Chat (Ask about your ideas)")
     if "ai_chat_history" not in st.session_state:
-        st.session_state.ai_chat_history = []  # List of (user, ai) tuples
+        st.session_state.ai_chat_history = []  # List of (user, ai, cached) tuples
     with st.form("ai_chat_form", clear_on_submit=True):
         ai_query = st.text_input("Ask AI about your ideas (e.g., 'What are the top engineering priorities?')", key="ai_search_box")
         send = st.form_submit_button("Send")
-    ai_answer = None
+    # Display chat history
+    for entry in st.session_state.ai_chat_history:
+        render_chat_message(*entry)
     if send and ai_query.strip():
-        with st.spinner("Thinking..."):
+        ai_answer = None
+        cached = False
+        if AI_CHAT_STREAMING:
+            # Stream tokens into the chat area; no rerun needed to show the answer
+            st.markdown(f"<div style='margin-bottom:0.5em;'><b>You:</b> {ai_query}</div>", unsafe_allow_html=True)
+            answer_slot = st.empty()
             try:
-                # Fetch all ideas for embedding
-                all_ideas = supabase.table("items").select("id", "title", "description").execute().data or []
-                vectorstore = get_vectorstore(SUPABASE_URL, SUPABASE_KEY, OPENAI_API_KEY)
-                ensure_idea_embeddings(vectorstore, all_ideas)
-                # Embed query and retrieve top 5 relevant ideas
-                with _log_lock:
-                    _integration_log.append((time.time(), 'QUERY', f"VectorStore.similarity_search: {ai_query}"))
-                docs = vectorstore.similarity_search(ai_query, k=5)
-                relevant_ideas = [doc.page_content for doc in docs]
-                # Compose prompt for LLM
-                context = "\n".join(relevant_ideas)
-                prompt = f"""
-                You are an expert product manager. Given the following ideas:
-                {context}
-                Answer the user's question: {ai_query}
-                """
-                llm = ChatOpenAI(openai_api_key=OPENAI_API_KEY, temperature=0.2)
-                ai_answer = llm.invoke(prompt).content
+                render_ai_message(answer_slot, "<i>Thinking...</i>")
+                ai_answer, cached = rag.answer(ai_query, filters, lambda text, done: render_ai_message(answer_slot, text if done else text + " ▌"))
+                render_ai_message(answer_slot, ai_answer, cached)
             except Exception as e:
-                with _log_lock:
-                    _integration_log.append((time.time(), 'ERROR', f"RAG/AI block: {str(e)}"))
-                st.error(f"AI/RAG error: {str(e)}")
-                ai_answer = None
-        # Add to chat history
-        st.session_state.ai_chat_history.append((ai_query, ai_answer))
-        # Clear input after send, only rerun if no error
-        if ai_answer is not None:
-            st.rerun()
-    # Display chat history
-    for user_msg, ai_msg in st.session_state.ai_chat_history:
-        st.markdown(f"<div style='margin-bottom:0.5em;'><b>You:</b> {user_msg}</div>", unsafe_allow_html=True)
-        st.markdown(f"<div style='background:#E9ECEF;padding:1em;border-radius:10px;margin-bottom:1.5em;'><b>AI:</b> {ai_msg}</div>", unsafe_allow_html=True)
+                log_event('ERROR', f"RAG/AI block: {str(e)}")
+                answer_slot.error(f"AI/RAG error: {str(e)}")
+            st.session_state.ai_chat_history.append((ai_query, ai_answer, cached))
+        else:
+            with st.spinner("Thinking..."):
+                try:
+                    ai_answer, cached = rag.answer(ai_query, filters)
+                except Exception as e:
+                    log_event('ERROR', f"RAG/AI block: {str(e)}")
+                    st.error(f"AI/RAG error: {str(e)}")
+                    ai_answer = None
+            # Add to chat history
+            st.session_state.ai_chat_history.append((ai_query, ai_answer, cached))
+            # Clear input after send, only rerun if no error
+            if ai_answer is not None:
+                st.rerun()
     # Tabs for each status
     statuses = ["idea", "backlog", "in_progress", "done", "blocked"]
     status_labels = ["Idea", "Backlog", "In Progress", "Done", "Blocked"]
+    display_item_forms(filters, statuses)
+    if "items" in prefetch_errors:
+        # Only the tabs need the items; the chat and forms above still work
+        st.warning(f"Could not load items: {prefetch_errors['items']}")
+        return
+    if PAGINATED:
+        # One page per tab, loaded by the prefetch; totals are planner estimates unless the last page is loaded
+        pagers = st.session_state.item_pagers
+        status_labels = [f"{label} ({pagers[status].count_text})" for label, status in zip(status_labels, statuses)]
+    else:
+        # One query for all tabs; reruns reuse the snapshot until a write invalidates it
+        snapshot = get_item_snapshot(filters)
+    if st.button("Refresh Items", key="refresh_items"):
+        invalidate_items()
+        st.rerun()
     tab_objs = st.tabs(status_labels)
 
-    for i, (tab, status) in enumerate(zip(tab_objs, statuses)):
+    for tab, status in zip(tab_objs, statuses):
         with tab:
-            # Fetch items for this status
-            query = supabase.table("items").select("*", "categories(name)", "sprints(name)")
-            query = query.eq("status", status)
-            if selected_priority != "All":
-                query = query.eq("priority", selected_priority)
-            if selected_category != "All":
-                cat_id = next((c["id"] for c in category_options_data if c["name"] == selected_category), None)
-                if cat_id:
-                    query = query.eq("category_id", cat_id)
-            if selected_sprint != "All":
-                sprint_id = next((s["id"] for s in sprints if s["name"] == selected_sprint), None)
-                if sprint_id:
-                    query = query.eq("sprint_id", sprint_id)
-            query = query.order("rank", desc=True)
-            items_response = query.execute()
-            items = items_response.data if items_response.data else []
-
-            # Add/Edit Item Form (only in the first tab for clarity)
-            if i == 0:
-                with st.form("add_edit_item_form", clear_on_submit=True):
-                    title = st.text_input("Title")
-                    description = st.text_area("Description")
-                    form_status = st.selectbox("Status", statuses, index=0)
-                    priority = st.selectbox("Priority", priorities)
-                    category = st.selectbox("Category", category_names)
-                    points = st.number_input("Points", min_value=0, max_value=100, value=0)
-                    submitted = st.form_submit_button("Add Item")
-                    if submitted and title:
-                        category_id = next((c["id"] for c in category_options_data if c["name"] == category), None)
-                        supabase.table("items").insert({
-                            "title": title,
-                            "description": description,
-                            "status": form_status,
-                            "priority": priority,
-                            "category_id": category_id,
-                            "points": points
-                        }).execute()
-                        st.success("Item added!")
-                        # Switch to the tab matching the new item's status
-                        st.experimental_set_query_params(tab=form_status)
-                        st.rerun()
-
+            pager = pagers[status] if PAGINATED else None
+            items_df = pager.page if PAGINATED else snapshot.get(status)
             st.markdown("---")
+            if PAGINATED:
+                first_row = (pager.page_number - 1) * pager.page_size + 1
+                page_col, prev_col, next_col = st.columns([4, 1, 1])
+                page_col.caption(f"Page {pager.page_number} · items {first_row}–{first_row + len(items_df) - 1} of {pager.count_text}" if not items_df.empty else f"Page {pager.page_number}")
+                if prev_col.button("Previous", key=f"prev_page_{status}", disabled=pager.page_number == 1):
+                    pager.previous_page()
+                    st.rerun()
+                if next_col.button("Next", key=f"next_page_{status}", disabled=not pager.has_more):
+                    pager.next_page()
+                    st.rerun()
             # Items Table for this status
-            if items:
-                df = pd.DataFrame(items)
+            if not items_df.empty:
+                df = items_df.copy()
                 if not df.empty:
                     df["Select"] = False
                     edited_df = st.data_editor(
@@ -418,43 +611,97 @@ def display_main_content():
                         use_container_width=True,
                         column_config={
                             "Select": st.column_config.CheckboxColumn("Select", help="Select items to manage", default=False),
-                            "rank": st.column_config.NumberColumn("Rank", help="Drag to reorder items", min_value=0, max_value=1000, step=1, format="%d"),
+                            "rank": st.column_config.NumberColumn("Rank", help="Higher ranks are listed first; use Move to Top/Bottom to reorder", step=1, format="%d"),
                             "title": st.column_config.TextColumn("Title", help="The title of the item"),
                             "description": None, "created_at": None
                         },
-                        key=f"items_data_editor_{status}"
+                        key=f"items_data_editor_{status}_{pager.page_number}" if PAGINATED else f"items_data_editor_{status}"
                     )
                     # Save changes
                     if st.button("Save Changes", key=f"save_item_changes_{status}"):
                         try:
-                            for index, row in edited_df.iterrows():
-                                original_id = df.loc[index, "id"]
-                                if row["rank"] != df.loc[index, "rank"]:
-                                    supabase.table("items").update({"rank": row["rank"]}).eq("id", original_id).execute()
-                            st.success("Changes saved!")
+                            result = bulk_update_ranks(supabase, diff_ranks(df, edited_df))
+                            invalidate_items(status)
+                            st.success(f"Changes saved! ({result['affected']} of {result['requested']} ranks updated)")
                             st.rerun()
                         except Exception as e:
                             st.error(f"Error updating items: {str(e)}")
                     # Bulk actions
                     selected_rows_df = edited_df[edited_df["Select"]]
                     if not selected_rows_df.empty:
+                        if PAGINATED:
+                            # Descriptions are not part of the page; fetch them for the selection only
+                            with st.expander("Descriptions of selected items"):
+                                descriptions = pager.get_descriptions(supabase, selected_rows_df["id"].tolist())
+                                for item_id, title in zip(selected_rows_df["id"], selected_rows_df["title"]):
+                                    st.markdown(f"**{title}**")
+                                    st.write(descriptions.get(str(item_id)) or "_No description_")
                         st.subheader("Selected Item Actions")
-                        col1, col2 = st.columns(2)
+                        col1, col2, col3, col4 = st.columns(4)
                         with col1:
                             if st.button("Delete Selected Items", key=f"delete_items_button_{status}"):
-                                for item_id in selected_rows_df["id"]:
-                                    supabase.table("items").delete().eq("id", item_id).execute()
-                                st.success("Selected items deleted!")
+                                result = bulk_delete_items(supabase, selected_rows_df["id"].tolist())
+                                invalidate_items(status)
+                                st.success(f"{result['affected']} selected items deleted!")
                                 st.rerun()
                         with col2:
                             if st.button("Promote Selected Items", key=f"promote_items_button_{status}"):
-                                for item_id in selected_rows_df["id"]:
-                                    supabase.table("items").update({"status": "in_progress"}).eq("id", item_id).execute()
-                                st.success("Selected items promoted to In Progress!")
+                                result = bulk_update_status(supabase, selected_rows_df["id"].tolist(), "in_progress")
+                                invalidate_items(status, "in_progress")
+                                st.success(f"{result['affected']} selected items promoted to In Progress!")
                                 st.rerun()
-                    # AI Re-ranking button
-                    if st.button("Re-Rank All Items with AI (Not Implemented)", key=f"re_rank_items_button_{status}"):
-                        st.info("AI Re-ranking feature placeholder.")
+                        # Moves only write the selected rows: they are ranked past the current top/bottom
+                        other_ranks = df.loc[~edited_df["Select"], "rank"].dropna()
+                        selected_ids = selected_rows_df["id"].tolist()
+                        with col3:
+                            if st.button("Move Selected to Top", key=f"move_top_button_{status}"):
+                                if PAGINATED:
+                                    top_rank = edge_rank(supabase, filters, status, top=True)
+                                else:
+                                    top_rank = int(other_ranks.max()) if not other_ranks.empty else None
+                                new_ranks = ranks_above(top_rank, len(selected_ids))
+                                bulk_update_ranks(supabase, [{"id": str(item_id), "rank": rank} for item_id, rank in zip(selected_ids, new_ranks)])
+                                if ranks_drifted(new_ranks):
+                                    schedule_rebalance(supabase)
+                                invalidate_items(status)
+                                st.rerun()
+                        with col4:
+                            if st.button("Move Selected to Bottom", key=f"move_bottom_button_{status}"):
+                                if PAGINATED:
+                                    bottom_rank = edge_rank(supabase, filters, status, top=False)
+                                else:
+                                    bottom_rank = int(other_ranks.min()) if not other_ranks.empty else None
+                                new_ranks = ranks_below(bottom_rank, len(selected_ids))
+                                bulk_update_ranks(supabase, [{"id": str(item_id), "rank": rank} for item_id, rank in zip(selected_ids, new_ranks)])
+                                if ranks_drifted(new_ranks):
+                                    schedule_rebalance(supabase)
+                                invalidate_items(status)
+                                st.rerun()
+                        if len(selected_ids) == 1:
+                            # One item moves between its neighbours with a single rank write (see poppy/ranking.py)
+                            rows = [{"id": str(item_id), "rank": None if pd.isna(rank) else int(rank)} for item_id, rank in zip(df["id"], df["rank"])]
+                            index = next(i for i, row in enumerate(rows) if row["id"] == str(selected_ids[0]))
+                            for col, up in zip(st.columns(2), (True, False)):
+                                neighbours = move_neighbours(rows, index, up)
+                                # Unranked neighbours have no gap to split; on a page edge the next neighbour is on another page
+                                movable = neighbours is not None and all(row is None or row["rank"] is not None for row in neighbours)
+                                if movable and PAGINATED:
+                                    movable = not (neighbours[0] is None and pager.page_number > 1 or neighbours[1] is None and pager.has_more)
+                                if col.button("Move Up" if up else "Move Down", key=f"move_{'up' if up else 'down'}_button_{status}", disabled=not movable):
+                                    move_item(supabase, rows[index]["id"], *neighbours)
+                                    invalidate_items(status)
+                                    st.rerun()
+                    # AI Re-ranking runs in a background job (see poppy/ai_rerank.py)
+                    if f"rerank_job_{status}" in st.session_state:
+                        poll_rerank_progress(status)
+                    else:
+                        notice = st.session_state.pop(f"rerank_notice_{status}", None)
+                        if notice:
+                            getattr(st, notice[0])(notice[1])
+                        if st.button("Re-Rank All Items with AI", key=f"re_rank_items_button_{status}", disabled=not OPENAI_API_KEY):
+                            llm = resources.get_chat_model(OPENAI_API_KEY, temperature=0)
+                            st.session_state[f"rerank_job_{status}"] = RerankJob(supabase, llm, filters, status).start()
+                            st.rerun()
                 else:
                     st.info("No items found based on current filters!")
             else:
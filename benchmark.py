@@ -0,0 +1,278 @@
+"""Offline benchmarks for the main app paths at growing backlog sizes.
+
+Each dataset is seeded into ``FakeSupabase`` (fake_backends.py) and the
+fakes are registered in ``resources`` under the keys the app asks for, so
+the real code runs unchanged with no network. Page render and the RAG
+question drive ``app_enhanced.py`` through Streamlit's ``AppTest``; the other
+scenarios call the same library functions the app's buttons use.
+
+The change feed runs on a ``LocalSource`` fed by the fake's write hook, so
+writes made outside the app reach it as they would through Realtime.
+
+Every scenario reports wall time, Supabase round trips (``execute`` calls)
+and peak traced Python memory:
+
+    python benchmark.py --sizes 1000,10000,100000 --sprints 50 --latency-ms 5
+"""
+import argparse
+import json
+import os
+import time
+import tracemalloc
+
+from poppy import resources
+from poppy.answer_cache import answer_cache
+from poppy.bulk_ops import bulk_delete_items, bulk_update_ranks, diff_ranks
+from poppy.change_feed import LocalSource, change_feed, connect_caches
+from poppy.embedding_cache import CachedEmbeddings, EmbeddingCache
+from fake_backends import FakeChatModel, FakeEmbeddings, FakeSupabase, seed
+from poppy.item_store import ItemSnapshot
+from poppy.query_metrics import query_metrics
+from poppy.reference_data import reference_data
+from poppy.sprint_metrics import get_sprint_metrics
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app_enhanced.py")
+SUPABASE_URL = "http://benchmark.invalid"
+SUPABASE_KEY = "benchmark-key"
+OPENAI_API_KEY = "benchmark-openai-key"
+DEFAULT_SIZES = (1000, 10000)
+RAG_QUESTION = "What are the top search and export priorities?"
+NO_FILTERS = {"priority": None, "category_id": None, "sprint_id": None}
+
+
+def install_fakes(client, embeddings, chat):
+    """Register the fakes where resources.get_* will find them"""
+    resources.close_all()
+    reference_data.invalidate()
+    answer_cache.clear()
+    query_metrics.reset()
+    resources._resources[("supabase", SUPABASE_URL, SUPABASE_KEY)] = client
+    resources._resources[("embeddings", OPENAI_API_KEY)] = embeddings
+    resources._resources[("chat", OPENAI_API_KEY, 0.2)] = chat
+    resources._resources[("chat", OPENAI_API_KEY, 0)] = chat
+    # The app finds the feed running and only subscribes its caches
+    change_feed.stop()
+    source = LocalSource()
+    client.on_change(source.emit)
+    connect_caches(change_feed)
+    change_feed.start(source)
+    change_feed.resync()
+
+
+def new_app_test():
+    from streamlit.testing.v1 import AppTest
+    os.environ["EMBEDDING_SYNC_INTERVAL"] = "0"
+    at = AppTest.from_file(APP_PATH, default_timeout=600)
+    at.secrets["SUPABASE_URL"] = SUPABASE_URL
+    at.secrets["SUPABASE_KEY"] = SUPABASE_KEY
+    at.secrets["OPENAI_API_KEY"] = OPENAI_API_KEY
+    return at
+
+
+def _check(at):
+    if at.exception:
+        raise RuntimeError(f"app raised: {at.exception[0].value}")
+    return at
+
+
+# --- Scenarios: fn(ctx) -> optional dict of extra numbers
+def scenario_page_render_cold(ctx):
+    ctx["app"] = _check(new_app_test().run())
+    return {"tabs": len(ctx["app"].tabs)}
+
+
+def scenario_page_render_warm(ctx):
+    _check(ctx["app"].run())
+
+
+def scenario_sprint_metrics(ctx):
+    sprint_ids = [row["id"] for row in ctx["client"].tables["sprints"]]
+    metrics = get_sprint_metrics(ctx["client"], sprint_ids)
+    get_sprint_metrics(ctx["client"], sprint_ids[:1])
+    return {"sprints": len(metrics)}
+
+
+def scenario_rank_save(ctx):
+    snapshot = ItemSnapshot(NO_FILTERS)
+    snapshot.refresh(ctx["client"])
+    df = snapshot.get("backlog")
+    edited = df.copy()
+    # Reverse the top 100 rows, as if dragged in the editor
+    top = edited.index[:100]
+    edited.loc[top, "rank"] = edited.loc[top, "rank"].values[::-1]
+    result = bulk_update_ranks(ctx["client"], diff_ranks(df, edited))
+    return {"ranks": result["affected"]}
+
+
+def scenario_bulk_delete(ctx):
+    ids = [row["id"] for row in ctx["client"].tables["items"] if row["status"] == "idea"][:500]
+    result = bulk_delete_items(ctx["client"], ids)
+    return {"deleted": result["affected"]}
+
+
+def scenario_rag_question(ctx):
+    at = ctx["app"]
+    at.text_input(key="ai_search_box").input(RAG_QUESTION)
+    send = next(button for button in at.button if button.label == "Send")
+    _check(send.click().run())
+
+
+def scenario_rag_question_cached(ctx):
+    # Same question again: should be answered from the semantic answer cache
+    scenario_rag_question(ctx)
+
+
+def scenario_remote_change(ctx):
+    # Another user moves 10 ideas to the backlog (1 round trip); the viewer's rerun applies it from the feed
+    ids = [row["id"] for row in ctx["client"].tables["items"] if row["status"] == "idea"][:10]
+    ctx["client"].table("items").update({"status": "backlog"}).in_("id", ids).execute()
+    _check(ctx["app"].run())
+    return {"changes": len(ids)}
+
+
+SCENARIOS = {
+    "page_render_cold": scenario_page_render_cold,
+    "page_render_warm": scenario_page_render_warm,
+    "sprint_metrics": scenario_sprint_metrics,
+    "rank_save": scenario_rank_save,
+    "rag_question": scenario_rag_question,
+    "rag_question_cached": scenario_rag_question_cached,
+    "remote_change": scenario_remote_change,
+    # Destructive; keep last
+    "bulk_delete": scenario_bulk_delete,
+}
+
+
+def measure(fn, ctx, trace_memory=True):
+    client = ctx["client"]
+    client.reset_counters()
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        extra = fn(ctx) or {}
+        error = None
+    except Exception as e:
+        extra, error = {}, f"{type(e).__name__}: {e}"
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    if trace_memory:
+        tracemalloc.stop()
+    return {
+        "seconds": elapsed,
+        "round_trips": client.total_round_trips(),
+        "by_operation": {f"{table}.{op}": n for (table, op), n in sorted(client.round_trips.items())},
+        "peak_mb": peak / 1e6 if peak is not None else None,
+        "error": error,
+        **extra,
+    }
+
+
+def warm_up(dim=64):
+    """One untimed pass on a tiny dataset so module imports don't land in the first size's numbers"""
+    embeddings = FakeEmbeddings(dim)
+    client = seed(FakeSupabase(), items=20, sprints=2, embeddings=embeddings)
+    install_fakes(client, CachedEmbeddings(embeddings, EmbeddingCache(":memory:")), FakeChatModel())
+    ctx = {"client": client}
+    scenario_page_render_cold(ctx)
+    scenario_rag_question(ctx)
+
+
+def run(sizes=DEFAULT_SIZES, sprints=20, latency=0.0, dim=64, scenarios=None, trace_memory=True):
+    """{size: {scenario: result}} for every dataset size"""
+    warm_up(dim)
+    results = {}
+    for size in sizes:
+        embeddings = FakeEmbeddings(dim)
+        client = seed(FakeSupabase(latency=latency), items=size, sprints=sprints, embeddings=embeddings)
+        install_fakes(client, CachedEmbeddings(embeddings, EmbeddingCache(":memory:")), FakeChatModel())
+        ctx = {"client": client}
+        results[size] = {}
+        for name, fn in SCENARIOS.items():
+            if scenarios and name not in scenarios:
+                continue
+            if name.startswith(("page_render_warm", "rag_question", "remote_change")) and "app" not in ctx:
+                ctx["app"] = _check(new_app_test().run())
+            results[size][name] = measure(fn, ctx, trace_memory)
+    resources.close_all()
+    return results
+
+
+def bench_middleware(queries=2000, rows=20, rounds=5):
+    """Per-query cost of the query middleware on a real supabase client over an in-process transport"""
+    import httpx
+    from supabase import ClientOptions, create_client
+    from poppy import query_middleware
+
+    body = json.dumps([{"id": i, "title": f"Idea {i}", "rank": i} for i in range(rows)]).encode()
+    transport = httpx.MockTransport(
+        lambda request: httpx.Response(200, content=body, headers={"content-type": "application/json"}))
+    client = create_client(SUPABASE_URL, SUPABASE_KEY, ClientOptions(httpx_client=httpx.Client(transport=transport)))
+
+    def timed():
+        started = time.perf_counter()
+        for _ in range(queries):
+            client.table("items").select("id, title, rank").eq("status", "idea").execute()
+        return (time.perf_counter() - started) / queries * 1e6
+
+    timed()
+    baseline, instrumented = [], []
+    # Alternate so drift affects both sides equally; best round of each
+    for _ in range(rounds):
+        query_middleware.uninstall(client)
+        baseline.append(timed())
+        query_middleware.install(client)
+        instrumented.append(timed())
+    query_middleware.uninstall(client)
+    return {"queries": queries, "rows": rows, "baseline_us": min(baseline),
+            "instrumented_us": min(instrumented), "overhead_us": min(instrumented) - min(baseline)}
+
+
+def format_results(results):
+    lines = [f"{'items':>8}  {'scenario':<22}{'ms':>10}{'round trips':>13}{'peak MB':>10}"]
+    for size, scenarios in results.items():
+        for name, result in scenarios.items():
+            peak = f"{result['peak_mb']:.1f}" if result["peak_mb"] is not None else "-"
+            line = f"{size:>8}  {name:<22}{result['seconds'] * 1000:>10.1f}{result['round_trips']:>13}{peak:>10}"
+            if result["error"]:
+                line += f"  ERROR {result['error']}"
+            lines.append(line)
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks against in-memory Supabase/OpenAI fakes")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="Comma-separated item counts, e.g. 1000,10000,100000")
+    parser.add_argument("--sprints", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Simulated latency per round trip")
+    parser.add_argument("--dim", type=int, default=64, help="Fake embedding dimension")
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS), help="Run only these (repeatable)")
+    parser.add_argument("--no-trace-memory", action="store_true", help="Skip tracemalloc (faster, no peak memory)")
+    parser.add_argument("--json", metavar="PATH", help="Also write the full results as JSON")
+    parser.add_argument("--middleware", action="store_true",
+                        help="Only measure the query middleware's per-query overhead")
+    args = parser.parse_args()
+
+    if args.middleware:
+        result = bench_middleware()
+        print(f"query middleware: {result['baseline_us']:.1f} us/query baseline, "
+              f"{result['instrumented_us']:.1f} us/query instrumented (+{result['overhead_us']:.1f} us)")
+        return
+
+    results = run(
+        sizes=[int(size) for size in args.sizes.split(",")],
+        sprints=args.sprints,
+        latency=args.latency_ms / 1000,
+        dim=args.dim,
+        scenarios=args.scenario,
+        trace_memory=not args.no_trace_memory,
+    )
+    print(format_results(results))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,625 @@
+"""In-memory stand-ins for Supabase and OpenAI, for offline benchmarks.
+
+``FakeSupabase`` implements the part of the supabase-py query builder the
+app uses (select with embeds and counts, insert/upsert/update/delete,
+eq/in_/is_/not_/or_ filters, order, limit, range) plus the project's RPCs,
+over plain Python lists. Every ``execute`` counts as one round trip and can
+sleep ``latency`` seconds to model the network. Writes to the change-feed
+tables maintain ``updated_at`` and ``row_tombstones`` like the triggers in
+20250606_change_feed.sql, and are reported to ``on_change`` listeners the
+way Realtime would (wire one to ``change_feed.LocalSource.emit``).
+
+``FakeEmbeddings`` and ``FakeChatModel`` are deterministic: the same text
+always gives the same vector or answer.
+"""
+import datetime
+import random
+import re
+import threading
+import time
+import uuid
+import zlib
+from collections import Counter
+
+import numpy as np
+
+from poppy.change_feed import DELETE, INSERT, TOMBSTONE_COLUMNS, TOMBSTONES_TABLE, UPDATE, WATCHED_TABLES
+from poppy.embedding_sync import DEFAULT_EMBEDDING_MODEL, EMBEDDING_ID_COLUMN, EMBEDDINGS_TABLE, content_hash, idea_text
+from poppy.query_middleware import register_builder
+
+PRIMARY_KEYS = {EMBEDDINGS_TABLE: (EMBEDDING_ID_COLUMN,), "related_ideas": ("idea1_id", "idea2_id")}
+# Embedded resources in select(), e.g. "categories(name)" -> categories row via items.category_id
+EMBEDS = {"categories": "category_id", "sprints": "sprint_id"}
+_EMBED = re.compile(r"^(\w+)\((.*)\)$")
+
+
+class FakeResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+def _coerce(value, sample):
+    """PostgREST filter values arrive as strings; compare them as the column's type"""
+    if isinstance(value, str) and isinstance(sample, (int, float)) and not isinstance(sample, bool):
+        return type(sample)(float(value)) if isinstance(sample, int) else float(value)
+    if not isinstance(value, str) and isinstance(sample, str):
+        return str(value)
+    return value
+
+
+def _compare(op, actual, expected):
+    if op == "is":
+        return actual is None if str(expected).lower() == "null" else actual == expected
+    if op == "in":
+        return actual in expected or str(actual) in expected
+    if actual is None:
+        return False
+    expected = _coerce(expected, actual)
+    if op == "eq":
+        return actual == expected
+    if op == "neq":
+        return actual != expected
+    if op == "lt":
+        return actual < expected
+    if op == "lte":
+        return actual <= expected
+    if op == "gt":
+        return actual > expected
+    if op == "gte":
+        return actual >= expected
+    raise ValueError(f"unsupported operator {op}")
+
+
+def _split_top_level(text):
+    parts, depth, start = [], 0, 0
+    for i, ch in enumerate(text):
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "," and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return [part.strip() for part in parts if part.strip()]
+
+
+def parse_logic(text):
+    """Predicate for a PostgREST logic tree, e.g. "rank.lt.5,and(rank.eq.5,id.lt.x)" (or-joined)"""
+    terms = [_parse_term(term) for term in _split_top_level(text)]
+    return lambda row: any(term(row) for term in terms)
+
+
+def _parse_term(term):
+    for combinator, join in (("and", all), ("or", any)):
+        if term.startswith(combinator + "("):
+            terms = [_parse_term(t) for t in _split_top_level(term[len(combinator) + 1:-1])]
+            return lambda row, terms=terms, join=join: join(t(row) for t in terms)
+    column, rest = term.split(".", 1)
+    negate = rest.startswith("not.")
+    if negate:
+        rest = rest[4:]
+    op, value = rest.split(".", 1)
+    if op == "in":
+        value = set(v.strip().strip('"') for v in value.strip("()").split(","))
+    return lambda row: _compare(op, row.get(column), value) != negate
+
+
+class FakeQuery:
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.op = "select"
+        self.columns = ("*",)
+        self.payload = None
+        self.on_conflict = None
+        self.predicates = []
+        self.orders = []
+        self.limit_count = None
+        self.offset = 0
+        self.count_method = None
+        self.head = False
+        self._negate_next = False
+
+    # --- operations
+    def select(self, *columns, count=None, head=None):
+        self.columns = columns or ("*",)
+        self.count_method = count
+        self.head = bool(head)
+        return self
+
+    def insert(self, rows, **kwargs):
+        self.op, self.payload = "insert", rows
+        return self
+
+    def upsert(self, rows, on_conflict=None, **kwargs):
+        self.op, self.payload, self.on_conflict = "upsert", rows, on_conflict
+        return self
+
+    def update(self, values, **kwargs):
+        self.op, self.payload = "update", values
+        return self
+
+    def delete(self, **kwargs):
+        self.op = "delete"
+        return self
+
+    # --- filters
+    @property
+    def not_(self):
+        self._negate_next = True
+        return self
+
+    def _filter(self, op, column, value):
+        negate, self._negate_next = self._negate_next, False
+        self.predicates.append(lambda row: _compare(op, row.get(column), value) != negate)
+        return self
+
+    def eq(self, column, value):
+        return self._filter("eq", column, value)
+
+    def neq(self, column, value):
+        return self._filter("neq", column, value)
+
+    def lt(self, column, value):
+        return self._filter("lt", column, value)
+
+    def lte(self, column, value):
+        return self._filter("lte", column, value)
+
+    def gt(self, column, value):
+        return self._filter("gt", column, value)
+
+    def gte(self, column, value):
+        return self._filter("gte", column, value)
+
+    def is_(self, column, value):
+        return self._filter("is", column, value)
+
+    def in_(self, column, values):
+        return self._filter("in", column, set(str(v) for v in values))
+
+    def or_(self, filters, reference_table=None):
+        self.predicates.append(parse_logic(filters))
+        return self
+
+    def order(self, column, desc=False, nullsfirst=None, foreign_table=None):
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, size, foreign_table=None):
+        self.limit_count = size
+        return self
+
+    def range(self, start, end, foreign_table=None):
+        self.offset = start
+        self.limit_count = end - start + 1
+        return self
+
+    # --- execution
+    def _matching(self, rows):
+        return [row for row in rows if all(predicate(row) for predicate in self.predicates)]
+
+    def _sorted(self, rows):
+        # Postgres puts NULLs first in descending order and last in ascending order
+        for column, desc in reversed(self.orders):
+            present = [row for row in rows if row.get(column) is not None]
+            missing = [row for row in rows if row.get(column) is None]
+            present.sort(key=lambda row: row[column], reverse=desc)
+            rows = missing + present if desc else present + missing
+        return rows
+
+    def _project(self, row):
+        out = {}
+        for column in self.columns:
+            for part in _split_top_level(column):
+                embed = _EMBED.match(part)
+                if part == "*":
+                    out.update(row)
+                elif embed:
+                    name, fields = embed.groups()
+                    target = self.client.lookup(name, row.get(EMBEDS.get(name)))
+                    out[name] = None if target is None else {
+                        field: target.get(field) for field in _split_top_level(fields)
+                    }
+                else:
+                    out[part] = row.get(part)
+        return out
+
+    def execute(self):
+        self.client.round_trip(self.table, self.op)
+        try:
+            with self.client.lock:
+                return self._execute()
+        finally:
+            self.client.flush_changes()
+
+    def _execute(self):
+        rows = self.client.tables.setdefault(self.table, [])
+        if self.op == "select":
+            matched = self._sorted(self._matching(rows))
+            count = len(matched) if self.count_method else None
+            if self.offset:
+                matched = matched[self.offset:]
+            if self.limit_count is not None:
+                matched = matched[:self.limit_count]
+            data = [] if self.head else [self._project(row) for row in matched]
+            return FakeResponse(data, count)
+        if self.op == "insert":
+            return FakeResponse(self.client.insert(self.table, self.payload))
+        if self.op == "upsert":
+            return FakeResponse(self.client.upsert(self.table, self.payload, self.on_conflict))
+        matched = self._matching(rows)
+        if self.op == "update":
+            for row in matched:
+                old = dict(row)
+                row.update(self.payload)
+                self.client.changed(self.table, UPDATE, row, old)
+            return FakeResponse([dict(row) for row in matched])
+        if self.op == "delete":
+            gone = set(map(id, matched))
+            self.client.tables[self.table] = [row for row in rows if id(row) not in gone]
+            self.client.reindex(self.table)
+            for row in matched:
+                self.client.changed(self.table, DELETE, None, row)
+            return FakeResponse(matched)
+        raise ValueError(f"unsupported operation {self.op}")
+
+
+class FakeRpc:
+    def __init__(self, client, name, params):
+        self.client = client
+        self.name = name
+        self.params = params or {}
+        self.limit_count = None
+
+    def limit(self, size, foreign_table=None):
+        self.limit_count = size
+        return self
+
+    def execute(self):
+        self.client.round_trip("rpc", self.name)
+        try:
+            with self.client.lock:
+                data = RPCS[self.name](self.client, self.params)
+        finally:
+            self.client.flush_changes()
+        if self.limit_count is not None and isinstance(data, list):
+            data = data[:self.limit_count]
+        return FakeResponse(data)
+
+
+class FakeSupabase:
+    """Drop-in for the supabase ``Client`` query surface, backed by dict rows"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.tables = {}
+        self._indexes = {}
+        self.lock = threading.RLock()
+        self._counter_lock = threading.Lock()
+        self.round_trips = Counter()
+        self.listeners = []
+        self._changes = []
+        self._tombstone_ids = 0
+
+    def from_(self, table):
+        return FakeQuery(self, table)
+
+    def table(self, table):
+        return self.from_(table)
+
+    def rpc(self, name, params=None, **kwargs):
+        return FakeRpc(self, name, params)
+
+    def round_trip(self, table, operation):
+        with self._counter_lock:
+            self.round_trips[(table, operation)] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def total_round_trips(self):
+        return sum(self.round_trips.values())
+
+    def reset_counters(self):
+        with self._counter_lock:
+            self.round_trips.clear()
+
+    def on_change(self, callback):
+        """Call ``callback(table, type, record, old_record)`` after each write to a watched table"""
+        self.listeners.append(callback)
+
+    def changed(self, table, change_type, record=None, old_record=None):
+        """Row-level triggers for the change feed (caller holds ``lock``)"""
+        if table not in WATCHED_TABLES:
+            return
+        if change_type == DELETE:
+            self._tombstone_ids += 1
+            kept = {column: old_record[column] for column in TOMBSTONE_COLUMNS[table] if column in old_record}
+            self.tables.setdefault(TOMBSTONES_TABLE, []).append({
+                "id": self._tombstone_ids, "table_name": table, "old_record": kept,
+                "deleted_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            })
+        else:
+            record["updated_at"] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        if self.listeners:
+            self._changes.append((table, change_type, record and dict(record), old_record and dict(old_record)))
+
+    def flush_changes(self):
+        """Deliver queued changes to listeners, outside ``lock``"""
+        with self.lock:
+            changes, self._changes = self._changes, []
+        for change in changes:
+            for listener in self.listeners:
+                listener(*change)
+
+    # --- storage helpers (callers hold ``lock``)
+    def _key_columns(self, table, on_conflict=None):
+        if on_conflict:
+            return tuple(column.strip() for column in on_conflict.split(","))
+        return PRIMARY_KEYS.get(table, ("id",))
+
+    def reindex(self, table):
+        columns = self._key_columns(table)
+        self._indexes[table] = {
+            tuple(str(row.get(c)) for c in columns): row for row in self.tables.get(table, [])
+        }
+
+    def _index(self, table):
+        if table not in self._indexes:
+            self.reindex(table)
+        return self._indexes[table]
+
+    def lookup(self, table, key):
+        if key is None:
+            return None
+        return self._index(table).get((str(key),))
+
+    def insert(self, table, rows):
+        rows = rows if isinstance(rows, list) else [rows]
+        now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        inserted = []
+        index = self._index(table)
+        columns = self._key_columns(table)
+        for row in rows:
+            row = dict(row)
+            if columns == ("id",):
+                row.setdefault("id", str(uuid.uuid4()))
+            row.setdefault("created_at", now)
+            self.tables.setdefault(table, []).append(row)
+            index[tuple(str(row.get(c)) for c in columns)] = row
+            self.changed(table, INSERT, row)
+            inserted.append(dict(row))
+        return inserted
+
+    def upsert(self, table, rows, on_conflict=None):
+        rows = rows if isinstance(rows, list) else [rows]
+        columns = self._key_columns(table, on_conflict)
+        if columns != self._key_columns(table):
+            index = {tuple(str(row.get(c)) for c in columns): row for row in self.tables.get(table, [])}
+        else:
+            index = self._index(table)
+        written = []
+        for row in rows:
+            existing = index.get(tuple(str(row.get(c)) for c in columns))
+            if existing is not None:
+                old = dict(existing)
+                existing.update(row)
+                self.changed(table, UPDATE, existing, old)
+                written.append(dict(existing))
+            else:
+                written.extend(self.insert(table, [row]))
+        return written
+
+
+# query_middleware.install(FakeSupabase()) works as it does for a real client
+register_builder(FakeQuery, lambda query: query.client, lambda query: (query.table, query.op),
+                 lambda query: (query.op, query.table))
+register_builder(FakeRpc, lambda rpc: rpc.client, lambda rpc: ("rpc", rpc.name), lambda rpc: ("rpc", rpc.name))
+
+
+# --- RPCs from supabase/migrations
+def _update_item_ranks(client, params):
+    updated = 0
+    for update in params["updates"]:
+        row = client.lookup("items", update["id"])
+        if row is not None:
+            old = dict(row)
+            row["rank"] = int(update["rank"])
+            client.changed("items", UPDATE, row, old)
+            updated += 1
+    return updated
+
+
+def _rebalance_item_ranks(client, params):
+    gap = params.get("gap", 65536)
+    rows = client.tables.get("items", [])
+    # Reverse of the display order (rank desc with NULLs first, then id desc)
+    ordered = sorted(rows, key=lambda row: (row.get("rank") is None, row.get("rank") or 0, str(row["id"])))
+    updated = 0
+    for i, row in enumerate(ordered, start=1):
+        if row.get("rank") != i * gap:
+            old = dict(row)
+            row["rank"] = i * gap
+            client.changed("items", UPDATE, row, old)
+            updated += 1
+    return updated
+
+
+def _get_sprint_metrics(client, params):
+    wanted = params.get("sprint_ids")
+    wanted = None if wanted is None else set(map(str, wanted))
+    metrics = {}
+    for link in client.tables.get("sprint_backlog", []):
+        sprint_id = str(link["sprint_id"])
+        if wanted is not None and sprint_id not in wanted:
+            continue
+        item = client.lookup("backlog_items", link["backlog_item_id"])
+        if item is None:
+            continue
+        m = metrics.setdefault(sprint_id, {"sprint_id": sprint_id, "total_points": 0, "completed_points": 0,
+                                           "item_count": 0, "completed_count": 0})
+        done = link.get("status") == "done"
+        m["total_points"] += item.get("points") or 0
+        m["completed_points"] += (item.get("points") or 0) if done else 0
+        m["item_count"] += 1
+        m["completed_count"] += int(done)
+    return list(metrics.values())
+
+
+def _match_documents(client, params):
+    rows = client.tables.get(EMBEDDINGS_TABLE, [])
+    if not rows:
+        return []
+    matrix = np.stack([np.asarray(row["embedding"], dtype=np.float32) for row in rows])
+    query = np.asarray(params["query_embedding"], dtype=np.float32)
+    scores = matrix @ query / (np.linalg.norm(matrix, axis=1) * (np.linalg.norm(query) or 1.0) + 1e-9)
+    order = np.argsort(-scores)
+    return [
+        {"id": rows[i][EMBEDDING_ID_COLUMN], "content": rows[i]["content"],
+         "metadata": rows[i].get("metadata") or {}, "similarity": float(scores[i])}
+        for i in order
+    ]
+
+
+def _mark_related_ideas_checked(client, params):
+    updated = 0
+    for update in params["updates"]:
+        row = client.lookup(EMBEDDINGS_TABLE, update["id"])
+        if row is not None:
+            row["related_ideas_hash"] = update["hash"]
+            updated += 1
+    return updated
+
+
+RPCS = {
+    "update_item_ranks": _update_item_ranks,
+    "rebalance_item_ranks": _rebalance_item_ranks,
+    "get_sprint_metrics": _get_sprint_metrics,
+    "match_documents": _match_documents,
+    "mark_related_ideas_checked": _mark_related_ideas_checked,
+}
+
+
+# --- Models
+class FakeEmbeddings:
+    """Bag-of-words vectors: texts sharing words get similar embeddings"""
+
+    def __init__(self, dim=64, model=DEFAULT_EMBEDDING_MODEL):
+        self.dim = dim
+        self.model = model
+        self._words = {}
+
+    def _word(self, word):
+        vector = self._words.get(word)
+        if vector is None:
+            rng = np.random.default_rng(zlib.crc32(word.encode("utf-8")))
+            vector = self._words[word] = rng.standard_normal(self.dim).astype(np.float32)
+        return vector
+
+    def _embed(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            vector += self._word(word)
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+class FakeMessage:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeChatModel:
+    """Answers with a fixed template; ``stream`` yields it word by word"""
+
+    model_name = "fake-chat"
+
+    def __init__(self, words=60):
+        self.words = words
+
+    def _answer(self, prompt):
+        seed = zlib.crc32(str(prompt).encode("utf-8"))
+        return " ".join(f"point{(seed + i) % 97}" for i in range(self.words))
+
+    def invoke(self, prompt, **kwargs):
+        return FakeMessage(self._answer(prompt))
+
+    def stream(self, prompt, **kwargs):
+        for word in self._answer(prompt).split(" "):
+            yield FakeMessage(word + " ")
+
+
+# --- Seeding
+CATEGORY_NAMES = ["Engineering", "Design", "Marketing", "Sales", "Support", "Data", "Security", "Ops"]
+STATUSES = ["idea", "backlog", "in_progress", "done", "blocked"]
+PRIORITIES = ["low", "medium", "high", "urgent"]
+WORDS = (
+    "api search export onboarding billing dashboard mobile sync cache report alert invite "
+    "sso audit theme upload import latency login filter chart webhook slack calendar"
+).split()
+
+
+def seed(client, items=1000, sprints=20, embeddings=None, seed_value=0):
+    """Fill ``client`` with a synthetic backlog; embeddings are stored if given"""
+    rng = random.Random(seed_value)
+    with client.lock:
+        client.insert("categories", [{"id": str(uuid.UUID(int=i + 1)), "name": name} for i, name in enumerate(CATEGORY_NAMES)])
+        category_ids = [row["id"] for row in client.tables["categories"]]
+        start = datetime.date(2025, 1, 6)
+        client.insert("sprints", [
+            {
+                "id": str(uuid.UUID(int=10_000 + i)),
+                "name": f"Sprint {i + 1}",
+                "start_date": (start + datetime.timedelta(days=14 * i)).isoformat(),
+                "end_date": (start + datetime.timedelta(days=14 * i + 13)).isoformat(),
+                "status": "planned",
+                "goal": "",
+            }
+            for i in range(sprints)
+        ])
+        sprint_ids = [row["id"] for row in client.tables["sprints"]]
+        rows = []
+        for i in range(items):
+            words = rng.sample(WORDS, 4)
+            rows.append({
+                "id": str(uuid.UUID(int=1_000_000 + i)),
+                "title": f"{words[0].title()} {words[1]} improvement {i}",
+                "description": f"Improve {words[1]} and {words[2]} for {words[3]} users. " * 3,
+                "status": rng.choice(STATUSES),
+                "priority": rng.choice(PRIORITIES),
+                "points": rng.randint(0, 13),
+                "rank": (items - i) * 65536,
+                "category_id": rng.choice(category_ids),
+                "sprint_id": rng.choice(sprint_ids) if sprint_ids and rng.random() < 0.5 else None,
+            })
+        client.insert("items", rows)
+        sprinted = [row for row in rows if row["sprint_id"]]
+        client.insert("backlog_items", [{"id": row["id"], "title": row["title"], "points": row["points"]} for row in sprinted])
+        client.insert("sprint_backlog", [
+            {"id": str(uuid.uuid4()), "sprint_id": row["sprint_id"], "backlog_item_id": row["id"], "status": row["status"]}
+            for row in sprinted
+        ])
+        if embeddings is not None:
+            texts = [idea_text(row) for row in rows]
+            vectors = embeddings.embed_documents(texts)
+            client.insert(EMBEDDINGS_TABLE, [
+                {
+                    EMBEDDING_ID_COLUMN: row["id"],
+                    "content": text,
+                    "metadata": {"id": row["id"]},
+                    "embedding": np.asarray(vector, dtype=np.float32),
+                    "content_hash": content_hash(row),
+                    "embedding_model": embeddings.model,
+                }
+                for row, text, vector in zip(rows, texts, vectors)
+            ])
+    client.reset_counters()
+    return client
@@ -1,59 +1,65 @@
 import streamlit as st
-import threading
+import os
 import time
+from poppy.integration_log import recent_events
+from poppy.query_metrics import query_metrics
 
-# Global log storage (thread-safe)
-_integration_log = []
-_log_lock = threading.Lock()
-
-# Monkey-patch for Supabase client
-_supabase_patched = False
-
-def patch_supabase_client(supabase_client):
-    global _supabase_patched
-    if _supabase_patched:
-        return
-    orig_from = supabase_client.from_
-    def from_patch(table_name):
-        orig_query = orig_from(table_name)
-        # Only patch .execute if it exists
-        if hasattr(orig_query, 'execute'):
-            orig_execute = orig_query.execute
-            def execute_patch(*args, **kwargs):
-                query_info = f"Supabase Query: {table_name} | Args: {args} | Kwargs: {kwargs}"
-                with _log_lock:
-                    _integration_log.append((time.time(), 'QUERY', query_info))
-                try:
-                    result = orig_execute(*args, **kwargs)
-                    with _log_lock:
-                        _integration_log.append((time.time(), 'RESPONSE', str(result)))
-                    return result
-                except Exception as e:
-                    with _log_lock:
-                        _integration_log.append((time.time(), 'ERROR', str(e)))
-                    raise
-            orig_query.execute = execute_patch
-        return orig_query
-    supabase_client.from_ = from_patch
-    _supabase_patched = True
+# Seconds between log refreshes (0 = only on the Refresh Log button)
+LOG_REFRESH_SECONDS = float(os.environ.get("INTEGRATION_LOG_REFRESH", "5"))
 
 def show_integration_log():
     st.markdown("---")
     st.subheader("🔍 Integration Debugger Log")
-    if st.button("Refresh Log", key="refresh_integration_log"):
-        st.rerun()
-    with _log_lock:
-        log_copy = list(_integration_log)
-    if not log_copy:
+    render_integration_log()
+    st.markdown("---")
+
+@st.fragment(run_every=LOG_REFRESH_SECONDS or None)
+def render_integration_log():
+    """Re-renders just the log, on a timer or the button, without rerunning the page"""
+    st.button("Refresh Log", key="refresh_integration_log")
+    events = recent_events(100)  # Show last 100 events
+    if not events:
         st.info("No integration events logged yet.")
     else:
         log_lines = []
-        for ts, event_type, details in log_copy[-100:]:  # Show last 100 events
-            tstr = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts))
-            color = '#FFB4A2' if event_type == 'ERROR' else '#4F8A8B'
-            log_lines.append(f"<div style='color:{color};font-size:0.95em;'><b>[{tstr}] {event_type}:</b> {details}</div>")
+        for event in events:
+            tstr = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(event.ts))
+            color = '#FFB4A2' if event.event_type == 'ERROR' else '#4F8A8B'
+            target = f"{event.table}.{event.operation} " if event.table else ""
+            size = f"rows={event.row_count} bytes={event.byte_size} " if event.row_count is not None else ""
+            log_lines.append(f"<div style='color:{color};font-size:0.95em;'><b>[{tstr}] {event.event_type}:</b> {target}{size}{event.details}</div>")
+            if event.suggestion:
+                log_lines.append(f"<div style='color:#3D5A80;font-size:0.9em;'><b>Suggestion:</b> {event.suggestion}</div>")
         st.markdown(
             f"<div style='max-height:300px;overflow-y:auto;background:#F5F7FA;border-radius:8px;padding:0.7em 1em 0.7em 1em;border:1px solid #E9ECEF;'>{''.join(log_lines)}</div>",
             unsafe_allow_html=True
         )
-    st.markdown("---") 
\ No newline at end of file
+
+def show_query_metrics():
+    st.subheader("⏱️ Query Latency")
+    rerun = query_metrics.current_rerun()
+    snapshot = query_metrics.snapshot()
+    # The current rerun is still running while the sidebar renders; show the last finished one too
+    previous = next((r for r in snapshot["reruns"] if rerun is None or r["rerun_id"] < rerun["rerun_id"]), None)
+    if previous:
+        st.caption(f"Last rerun: {previous['calls']} calls totalling {previous['total_ms']:.0f} ms ({previous['bytes']} bytes)")
+    if rerun:
+        st.caption(f"This rerun so far: {rerun['calls']} calls totalling {rerun['total_ms']:.0f} ms")
+    if not snapshot["operations"]:
+        st.info("No timed calls yet.")
+        return
+    st.dataframe(
+        [
+            {
+                "table": op["table"], "operation": op["operation"], "calls": op["count"],
+                "p50 ms": round(op["p50_ms"], 1), "p95 ms": round(op["p95_ms"], 1), "p99 ms": round(op["p99_ms"], 1),
+                "bytes": op["bytes"], "errors": op["errors"],
+            }
+            for op in snapshot["operations"]
+        ],
+        hide_index=True,
+        use_container_width=True,
+    )
+    col1, col2 = st.columns(2)
+    col1.download_button("Prometheus", query_metrics.to_prometheus(), file_name="poppy_metrics.prom", mime="text/plain", key="download_metrics_prom")
+    col2.download_button("JSON", query_metrics.to_json(), file_name="poppy_metrics.json", mime="application/json", key="download_metrics_json")
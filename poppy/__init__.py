@@ -0,0 +1,20 @@
+"""Poppy Ideation core: data access, sprint metrics, embeddings and RAG.
+
+Nothing here imports Streamlit, so the modules can be used from scripts and
+workers as well as from ``app_enhanced.py``. Submodules are imported on first
+attribute access (``poppy.rag``), and LangChain/OpenAI only when a model is
+first needed, so ``import poppy`` is cheap.
+"""
+import importlib
+
+__all__ = [
+    "ai_rerank", "answer_cache", "bulk_ops", "change_feed", "embedding_cache", "embedding_sync", "export", "importer",
+    "integration_log", "item_store", "prefetch", "query_metrics", "query_middleware", "rag", "ranking",
+    "reference_data", "related_ideas", "resources", "sprint_metrics", "vector_index",
+]
+
+
+def __getattr__(name):
+    if name in __all__:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
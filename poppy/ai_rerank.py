@@ -0,0 +1,271 @@
+"""AI re-ranking of the items in one status tab.
+
+Items are scored by the chat model in batches of ``batch_size`` per prompt,
+with up to ``concurrency`` prompts in flight and exponential backoff on
+errors. Scores are cached in SQLite per (prompt version, model, item
+content), so unchanged items are never re-scored. The tab's new order is
+written back with one ``bulk_update_ranks`` call.
+
+``RerankJob`` runs the whole pipeline in a background thread with progress
+counters and cancellation, so the Streamlit script only polls it.
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .bulk_ops import bulk_update_ranks
+from .item_store import build_items_query
+from .query_metrics import timed
+from .ranking import ranks_below
+
+RERANK_BATCH_SIZE = int(os.environ.get("RERANK_BATCH_SIZE", "25"))
+RERANK_CONCURRENCY = int(os.environ.get("RERANK_CONCURRENCY", "4"))
+RERANK_MAX_RETRIES = int(os.environ.get("RERANK_MAX_RETRIES", "4"))
+RERANK_CACHE_PATH = os.environ.get("RERANK_CACHE_PATH", os.path.join(".cache", "rerank_scores.sqlite"))
+BACKOFF_SECONDS = 1.0
+MAX_DESCRIPTION_CHARS = 500
+PAGE_SIZE = 1000
+# Bump when the prompt changes so cached scores are not reused
+PROMPT_VERSION = "1"
+RERANK_COLUMNS = ("id", "title", "description", "priority", "points", "rank", "categories(name)")
+
+_SQL_BATCH = 500
+_shared_caches = {}
+_shared_lock = threading.Lock()
+
+
+class Cancelled(Exception):
+    pass
+
+
+def item_prompt_text(item):
+    """The part of an item the model sees; also what the score cache is keyed on"""
+    category = (item.get("categories") or {}).get("name") or ""
+    description = (item.get("description") or "")[:MAX_DESCRIPTION_CHARS]
+    return f"{item['title']} | priority: {item.get('priority') or ''} | points: {item.get('points') or 0} | category: {category} | {description}"
+
+
+def score_key(model, item):
+    text = f"{PROMPT_VERSION}\0{model}\0{item_prompt_text(item)}"
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ScoreCache:
+    """SQLite store of item scores keyed by score_key"""
+
+    def __init__(self, path=RERANK_CACHE_PATH):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS scores (key TEXT PRIMARY KEY, score REAL NOT NULL, created REAL NOT NULL)")
+        self._conn.commit()
+
+    def get_many(self, keys):
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), _SQL_BATCH):
+                chunk = keys[i:i + _SQL_BATCH]
+                marks = ",".join("?" * len(chunk))
+                found.update(self._conn.execute(f"SELECT key, score FROM scores WHERE key IN ({marks})", chunk))
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, scores):
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO scores (key, score, created) VALUES (?, ?, ?)",
+                [(key, score, now) for key, score in scores.items()],
+            )
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM scores")
+            self._conn.commit()
+
+
+def get_score_cache(path=RERANK_CACHE_PATH):
+    with _shared_lock:
+        cache = _shared_caches.get(path)
+        if cache is None:
+            cache = _shared_caches[path] = ScoreCache(path)
+        return cache
+
+
+def build_prompt(items):
+    lines = "\n".join(f"{i}. {item_prompt_text(item)}" for i, item in enumerate(items))
+    return f"""
+    You are an expert product manager prioritising a backlog.
+    Score each item from 0 (lowest priority) to 100 (highest priority) by expected
+    impact relative to effort. Items are "title | priority | points | category | description":
+    {lines}
+    Reply with JSON only, mapping every item number to its score, e.g. {{"0": 72, "1": 15}}.
+    """
+
+
+def parse_scores(text, count):
+    """[score] * count from the model reply; raises ValueError if any is missing"""
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    if match is None:
+        raise ValueError("no JSON object in reply")
+    data = json.loads(match.group(0))
+    try:
+        return [float(data[str(i)]) for i in range(count)]
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"incomplete scores: {e}") from e
+
+
+def score_batch(llm, items, cancel_event=None, max_retries=RERANK_MAX_RETRIES):
+    """Scores for one batch, retrying with exponential backoff and jitter"""
+    prompt = build_prompt(items)
+    for attempt in range(max_retries + 1):
+        if cancel_event is not None and cancel_event.is_set():
+            raise Cancelled()
+        try:
+            with timed("openai", "rerank.batch") as info:
+                reply = llm.invoke(prompt).content
+                info["bytes"] = len(reply.encode("utf-8"))
+            return parse_scores(reply, len(items))
+        except Exception:
+            if attempt == max_retries:
+                raise
+            delay = BACKOFF_SECONDS * (2 ** attempt) * (1 + random.random())
+            if cancel_event is not None and cancel_event.wait(delay):
+                raise Cancelled()
+            elif cancel_event is None:
+                time.sleep(delay)
+
+
+def new_ranks(items, scores):
+    """[{"id", "rank"}] for rows whose rank changes when ordered by score.
+
+    The tab's existing rank values are reused in the new order, so the tab
+    keeps its place relative to other rows; if they are not unique and
+    non-null, fresh gap-spaced ranks are used instead.
+    """
+    ordered = sorted(items, key=lambda item: (-scores[str(item["id"])], -(item.get("rank") or 0)))
+    current = [item.get("rank") for item in items]
+    if None not in current and len(set(current)) == len(current):
+        slots = sorted(current, reverse=True)
+    else:
+        slots = ranks_below(None, len(items))
+    return [
+        {"id": str(item["id"]), "rank": int(rank)}
+        for item, rank in zip(ordered, slots) if item.get("rank") != rank
+    ]
+
+
+def fetch_tab_items(client, filters, status):
+    items = []
+    while True:
+        page = build_items_query(client, filters, statuses=[status], columns=RERANK_COLUMNS)\
+            .range(len(items), len(items) + PAGE_SIZE - 1).execute().data or []
+        items.extend(page)
+        if len(page) < PAGE_SIZE:
+            return items
+
+
+class RerankJob:
+    """Background re-rank of one status tab with progress and cancellation"""
+
+    def __init__(self, client, llm, filters, status, cache=None,
+                 batch_size=RERANK_BATCH_SIZE, concurrency=RERANK_CONCURRENCY):
+        self.client = client
+        self.llm = llm
+        self.filters = dict(filters)
+        self.status = status
+        self.cache = cache or get_score_cache()
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.model = getattr(llm, "model_name", None) or getattr(llm, "model", None) or "chat"
+        self.state = "pending"
+        self.error = None
+        self.result = None
+        self.total = 0
+        self.done = 0
+        self.cached = 0
+        self.started = None
+        self.finished = None
+        self._cancel = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self.state in ("pending", "loading", "scoring", "writing")
+
+    def start(self):
+        self.started = time.time()
+        self._thread = threading.Thread(target=self._run, name=f"rerank-{self.status}", daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _run(self):
+        try:
+            self.result = self.run()
+            self.state = "done"
+        except Cancelled:
+            self.state = "cancelled"
+        except Exception as e:
+            self.error = e
+            self.state = "failed"
+        finally:
+            self.finished = time.time()
+
+    def run(self):
+        """Score and re-rank synchronously; returns a summary dict"""
+        self.state = "loading"
+        items = fetch_tab_items(self.client, self.filters, self.status)
+        keys = {str(item["id"]): score_key(self.model, item) for item in items}
+        cached = self.cache.get_many(list(set(keys.values())))
+        scores = {item_id: cached[key] for item_id, key in keys.items() if key in cached}
+        missing = [item for item in items if str(item["id"]) not in scores]
+        self.total = len(items)
+        self.done = self.cached = len(scores)
+
+        self.state = "scoring"
+        batches = [missing[i:i + self.batch_size] for i in range(0, len(missing), self.batch_size)]
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="rerank") as pool:
+            futures = {pool.submit(score_batch, self.llm, batch, self._cancel): batch for batch in batches}
+            try:
+                for future in as_completed(futures):
+                    batch = futures[future]
+                    fresh = {str(item["id"]): score for item, score in zip(batch, future.result())}
+                    # Cache each batch as it lands so a cancelled run keeps its progress
+                    self.cache.put_many({keys[item_id]: score for item_id, score in fresh.items()})
+                    scores.update(fresh)
+                    self.done += len(batch)
+                    if self._cancel.is_set():
+                        raise Cancelled()
+            except BaseException:
+                self._cancel.set()
+                for future in futures:
+                    future.cancel()
+                raise
+
+        self.state = "writing"
+        updates = new_ranks(items, scores)
+        written = bulk_update_ranks(self.client, updates)
+        return {
+            "items": len(items),
+            "scored": len(missing),
+            "cached": self.cached,
+            "batches": len(batches),
+            "updated": written["affected"],
+            "seconds": time.time() - self.started if self.started else None,
+        }
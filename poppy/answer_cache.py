@@ -0,0 +1,130 @@
+"""Semantic cache for RAG answers.
+
+An answer is reused when a new question's embedding has cosine similarity
+above ``threshold`` with a cached question in the same retrieval scope, and
+the ideas it was built from are unchanged. Each entry stores the content
+hash of every retrieved idea; on a hit the caller-supplied
+``current_hashes(idea_ids)`` is compared against them and the entry is
+dropped if any idea changed. Entries are bounded by LRU size and TTL.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_THRESHOLD = float(os.environ.get("ANSWER_CACHE_THRESHOLD", "0.95"))
+DEFAULT_MAX_ENTRIES = int(os.environ.get("ANSWER_CACHE_MAX_ENTRIES", "256"))
+DEFAULT_TTL = float(os.environ.get("ANSWER_CACHE_TTL", "3600"))
+
+
+class CachedAnswer:
+    __slots__ = ("query", "vector", "answer", "idea_hashes", "scope", "created")
+
+    def __init__(self, query, vector, answer, idea_hashes, scope):
+        self.query = query
+        self.vector = vector
+        self.answer = answer
+        self.idea_hashes = idea_hashes
+        self.scope = scope
+        self.created = time.time()
+
+
+def _unit(vector):
+    vector = np.asarray(vector, dtype=np.float32).ravel()
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class AnswerCache:
+    def __init__(self, threshold=DEFAULT_THRESHOLD, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._next_key = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        for key in [key for key, entry in self._entries.items() if entry.created < cutoff]:
+            del self._entries[key]
+
+    def _best_match(self, vector, scope):
+        candidates = [(key, entry) for key, entry in self._entries.items() if entry.scope == scope]
+        if not candidates:
+            return None
+        scores = np.stack([entry.vector for _, entry in candidates]) @ vector
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            return None
+        return candidates[best]
+
+    def lookup(self, query_vector, scope, current_hashes):
+        """Cached answer text for a similar question, or None.
+
+        ``current_hashes(idea_ids)`` returns {idea_id: content_hash} for the
+        ideas as they are now; any difference invalidates the entry.
+        """
+        vector = _unit(query_vector)
+        with self._lock:
+            self._expire()
+            match = self._best_match(vector, scope)
+        if match is not None:
+            key, entry = match
+            if current_hashes(list(entry.idea_hashes)) == entry.idea_hashes:
+                with self._lock:
+                    if key in self._entries:
+                        self._entries.move_to_end(key)
+                    self.hits += 1
+                return entry.answer
+            with self._lock:
+                self._entries.pop(key, None)
+                self.invalidations += 1
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def store(self, query, query_vector, answer, idea_hashes, scope):
+        """Cache an answer with the {idea_id: content_hash} of the ideas it used"""
+        if not answer or not idea_hashes or None in idea_hashes:
+            return
+        with self._lock:
+            self._entries[self._next_key] = CachedAnswer(query, _unit(query_vector), answer, dict(idea_hashes), scope)
+            self._next_key += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_ideas(self, idea_ids):
+        """Drop every entry built from any of these ideas"""
+        idea_ids = {str(idea_id) for idea_id in idea_ids}
+        if not idea_ids:
+            return
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if idea_ids.intersection(entry.idea_hashes)]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "threshold": self.threshold,
+            }
+
+
+answer_cache = AnswerCache()
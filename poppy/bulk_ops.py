@@ -0,0 +1,58 @@
+"""Batched writes for the items table.
+
+Rank saves go through the ``update_item_ranks`` RPC
+(20250603_add_bulk_rank_update.sql); deletes and status changes are sent as
+``in_("id", [...])`` filters. Large selections are split into chunks and
+every call returns one summary dict.
+"""
+
+RANK_CHUNK_SIZE = 1000
+ID_CHUNK_SIZE = 150  # keeps the in_() filter well under URL length limits
+
+
+def _chunks(values, size):
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def _summary(requested, affected, requests):
+    return {"requested": requested, "affected": affected, "requests": requests}
+
+
+def diff_ranks(df, edited_df):
+    """Rows whose rank changed in the editor, as [{"id", "rank"}]"""
+    before = df["rank"].reindex(edited_df.index)
+    after = edited_df["rank"]
+    changed = after.ne(before) & ~(after.isna() & before.isna())
+    rows = edited_df.loc[changed & after.notna(), ["id", "rank"]]
+    return [
+        {"id": str(item_id), "rank": int(rank)}
+        for item_id, rank in zip(rows["id"].tolist(), rows["rank"].tolist())
+    ]
+
+
+def bulk_update_ranks(client, updates, chunk_size=RANK_CHUNK_SIZE):
+    """Write many rank changes with one RPC call per chunk"""
+    affected = requests = 0
+    for chunk in _chunks(list(updates), chunk_size):
+        affected += client.rpc("update_item_ranks", {"updates": chunk}).execute().data or 0
+        requests += 1
+    return _summary(len(updates), affected, requests)
+
+
+def bulk_delete_items(client, ids, chunk_size=ID_CHUNK_SIZE):
+    ids = [str(item_id) for item_id in ids]
+    affected = requests = 0
+    for chunk in _chunks(ids, chunk_size):
+        affected += len(client.table("items").delete().in_("id", chunk).execute().data or [])
+        requests += 1
+    return _summary(len(ids), affected, requests)
+
+
+def bulk_update_status(client, ids, status, chunk_size=ID_CHUNK_SIZE):
+    ids = [str(item_id) for item_id in ids]
+    affected = requests = 0
+    for chunk in _chunks(ids, chunk_size):
+        affected += len(client.table("items").update({"status": status}).in_("id", chunk).execute().data or [])
+        requests += 1
+    return _summary(len(ids), affected, requests)
@@ -0,0 +1,375 @@
+"""Process-wide feed of row changes on the tables the UI shows.
+
+One source per process publishes ``Change`` events into ``change_feed``:
+Supabase Realtime (``postgres_changes``), or a poller on ``updated_at`` plus
+``row_tombstones`` for deletes when Realtime is unavailable
+(20250606_change_feed.sql). ``LocalSource`` publishes whatever it is handed,
+for tests and the offline fakes.
+
+Shared caches subscribe to the feed and patch themselves row by row
+(``connect_caches``). Sessions don't subscribe; they keep the sequence
+number they last saw and ask ``changes_since`` on their next rerun, so N
+viewers cost one subscription.
+"""
+import asyncio
+import datetime
+import os
+import threading
+from collections import deque, namedtuple
+
+from .answer_cache import answer_cache
+from .integration_log import log_event
+from .item_store import live_items
+from .reference_data import reference_data
+
+WATCHED_TABLES = ("items", "sprints", "categories", "sprint_backlog")
+PRIMARY_KEYS = {"sprint_backlog": ("sprint_id", "backlog_item_id")}
+TOMBSTONES_TABLE = "row_tombstones"
+# Columns a tombstone keeps of the deleted row: its key, and for items the columns that route it to a tab
+# (the record_row_tombstone() trigger arguments in 20250610_row_tombstones_rls.sql)
+TOMBSTONE_COLUMNS = {
+    "items": ("id", "status", "priority", "category_id", "sprint_id"),
+    "sprints": ("id",),
+    "categories": ("id",),
+    "sprint_backlog": ("sprint_id", "backlog_item_id"),
+}
+# "realtime" (falls back to polling), "poll" or "off"
+CHANGE_FEED = os.environ.get("CHANGE_FEED", "realtime")
+POLL_INTERVAL = float(os.environ.get("CHANGE_FEED_POLL_INTERVAL", "5"))
+# Re-read rows this far behind the newest updated_at seen, for transactions that commit late
+POLL_OVERLAP = float(os.environ.get("CHANGE_FEED_POLL_OVERLAP", "2"))
+LOG_SIZE = int(os.environ.get("CHANGE_FEED_LOG_SIZE", "5000"))
+
+INSERT, UPDATE, DELETE = "INSERT", "UPDATE", "DELETE"
+# Published when changes may have been missed (reconnect, source switch): drop derived state
+RESYNC = "RESYNC"
+
+Change = namedtuple("Change", "seq table type record old_record")
+
+
+def row_key(table, row):
+    return tuple(str(row.get(column)) for column in PRIMARY_KEYS.get(table, ("id",)))
+
+
+class ChangeFeed:
+    """Sequence-numbered change log with subscriber callbacks"""
+
+    def __init__(self, log_size=LOG_SIZE):
+        self._log = deque(maxlen=log_size)
+        self._lock = threading.Lock()
+        self._subscribers = []
+        self.seq = 0
+        # Sessions that last saw a seq below this have missed changes
+        self._floor = 0
+        self.source = None
+        self.events = 0
+        self.resyncs = 0
+        self.last_event_at = None
+
+    @property
+    def running(self):
+        return self.source is not None
+
+    def subscribe(self, callback, tables=None):
+        """Call ``callback(change)`` for changes on ``tables`` (all if None) and every RESYNC.
+
+        Returns a function that unsubscribes.
+        """
+        entry = (callback, None if tables is None else frozenset(tables))
+        with self._lock:
+            self._subscribers.append(entry)
+
+        def unsubscribe():
+            with self._lock:
+                if entry in self._subscribers:
+                    self._subscribers.remove(entry)
+        return unsubscribe
+
+    def publish(self, table, change_type, record=None, old_record=None):
+        with self._lock:
+            self.seq += 1
+            change = Change(self.seq, table, change_type, record, old_record)
+            if change_type == RESYNC:
+                self._log.clear()
+                self._floor = self.seq
+                self.resyncs += 1
+            else:
+                if len(self._log) == self._log.maxlen:
+                    self._floor = self._log[0].seq
+                self._log.append(change)
+                self.events += 1
+            self.last_event_at = datetime.datetime.now(datetime.timezone.utc)
+            subscribers = list(self._subscribers)
+        for callback, tables in subscribers:
+            if tables is not None and change_type != RESYNC and table not in tables:
+                continue
+            try:
+                callback(change)
+            except Exception as e:
+                log_event('ERROR', f"change feed subscriber: {e}", table=table, operation="change_feed")
+        return change
+
+    def resync(self):
+        return self.publish(None, RESYNC)
+
+    def changes_since(self, seq):
+        """(current seq, changes after ``seq``, complete); incomplete means some were missed"""
+        with self._lock:
+            if seq < self._floor:
+                return self.seq, [], False
+            return self.seq, [change for change in self._log if change.seq > seq], True
+
+    def start(self, source):
+        """Start ``source`` unless one is already running; returns the running source"""
+        with self._lock:
+            if self.source is not None:
+                return self.source
+            self.source = source
+        source.start(self)
+        return source
+
+    def switch(self, source):
+        """Replace the running source (e.g. Realtime -> polling); changes in between may be lost"""
+        with self._lock:
+            self.source = source
+        source.start(self)
+        self.resync()
+
+    def stop(self):
+        with self._lock:
+            source, self.source = self.source, None
+        if source is not None:
+            source.stop()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "source": getattr(self.source, "name", None),
+                "seq": self.seq,
+                "events": self.events,
+                "resyncs": self.resyncs,
+                "subscribers": len(self._subscribers),
+                "last_event_at": self.last_event_at,
+            }
+
+
+change_feed = ChangeFeed()
+
+
+# --- Sources: start(feed) / stop()
+class LocalSource:
+    """Publishes the changes handed to ``emit``; a stand-in for Realtime in tests and benchmarks"""
+    name = "local"
+
+    def __init__(self):
+        self.feed = None
+
+    def start(self, feed):
+        self.feed = feed
+
+    def stop(self):
+        self.feed = None
+
+    def emit(self, table, change_type, record=None, old_record=None):
+        if self.feed is not None:
+            self.feed.publish(table, change_type, record, old_record)
+
+
+class PollingSource:
+    """Polls ``updated_at`` and ``row_tombstones`` every ``interval`` seconds in a daemon thread"""
+    name = "poll"
+
+    def __init__(self, client, tables=WATCHED_TABLES, interval=POLL_INTERVAL, overlap=POLL_OVERLAP):
+        self.client = client
+        self.tables = tuple(tables)
+        self.interval = interval
+        self.overlap = datetime.timedelta(seconds=overlap)
+        self.feed = None
+        # table -> {row key: updated_at} for rows inside the overlap window
+        self._seen = {}
+        self._watermarks = {}
+        self._last_tombstone = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, feed):
+        self.feed = feed
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="change-feed-poll", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                if self._last_tombstone is None:
+                    self.start_watermarks()
+                else:
+                    self.poll_once()
+            except Exception as e:
+                log_event('ERROR', f"change feed poll failed: {e}", operation="change_feed")
+            self._stop.wait(self.interval)
+
+    def start_watermarks(self):
+        """Begin from the newest rows; only later changes are published"""
+        for table in self.tables:
+            rows = self.client.table(table).select("updated_at")\
+                .not_.is_("updated_at", "null").order("updated_at", desc=True).limit(1).execute().data or []
+            self._watermarks[table] = datetime.datetime.fromisoformat(rows[0]["updated_at"]) if rows else None
+        rows = self.client.table(TOMBSTONES_TABLE).select("id").order("id", desc=True).limit(1).execute().data or []
+        self._last_tombstone = rows[0]["id"] if rows else 0
+        # Rows inside the overlap window are already current
+        self.poll_once(publish=False)
+
+    def poll_once(self, publish=True):
+        """Publish rows written and deleted since the last poll. Returns the number of changes."""
+        published = 0
+        for table in self.tables:
+            query = self.client.table(table).select("*").not_.is_("updated_at", "null")
+            watermark = self._watermarks.get(table)
+            if watermark is not None:
+                query = query.gte("updated_at", (watermark - self.overlap).isoformat())
+            rows = query.order("updated_at").execute().data or []
+            seen = self._seen.setdefault(table, {})
+            for row in rows:
+                key = row_key(table, row)
+                updated_at = datetime.datetime.fromisoformat(row["updated_at"])
+                if seen.get(key) == updated_at:
+                    continue
+                seen[key] = updated_at
+                if publish:
+                    # Polling can't tell inserts from updates, nor see the old row
+                    self.feed.publish(table, UPDATE, row, None)
+                    published += 1
+            if rows:
+                self._watermarks[table] = max(seen.values())
+                cutoff = self._watermarks[table] - self.overlap
+                self._seen[table] = {key: ts for key, ts in seen.items() if ts >= cutoff}
+        tombstones = self.client.table(TOMBSTONES_TABLE).select("*")\
+            .gt("id", self._last_tombstone).in_("table_name", list(self.tables)).order("id").execute().data or []
+        for row in tombstones:
+            if publish:
+                self.feed.publish(row["table_name"], DELETE, None, row["old_record"])
+                published += 1
+            self._last_tombstone = row["id"]
+        return published
+
+
+class RealtimeSource:
+    """Supabase Realtime ``postgres_changes`` on one channel, run on an asyncio loop in a daemon thread.
+
+    If the connection fails or the channel errors, the feed switches to ``fallback``.
+    """
+    name = "realtime"
+
+    def __init__(self, supabase_url, supabase_key, tables=WATCHED_TABLES, fallback=None):
+        self.url = f"{supabase_url.rstrip('/')}/realtime/v1"
+        self.key = supabase_key
+        self.tables = tuple(tables)
+        self.fallback = fallback
+        self.feed = None
+        self._loop = None
+        self._done = None
+        self._subscribed_once = False
+        self._thread = None
+
+    def start(self, feed):
+        self.feed = feed
+        self._thread = threading.Thread(target=self._run, name="change-feed-realtime", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._loop is not None and self._done is not None:
+            self._loop.call_soon_threadsafe(self._done.set)
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._listen())
+        except Exception as e:
+            self._fail(e)
+        finally:
+            self._loop.close()
+
+    async def _listen(self):
+        from realtime import AsyncRealtimeClient
+        self._done = asyncio.Event()
+        client = AsyncRealtimeClient(self.url, self.key)
+        await client.connect()
+        channel = client.channel("poppy-change-feed")
+        for table in self.tables:
+            channel.on_postgres_changes("*", callback=self._on_change, table=table, schema="public")
+        await channel.subscribe(self._on_subscribe)
+        await self._done.wait()
+        await client.close()
+
+    def _on_subscribe(self, status, error):
+        status = getattr(status, "value", status)
+        if status == "SUBSCRIBED":
+            log_event('RESPONSE', "realtime change feed subscribed", operation="change_feed")
+            if self._subscribed_once:
+                # Rejoined after a disconnect: anything in between is lost
+                self.feed.resync()
+            self._subscribed_once = True
+        elif status in ("CHANNEL_ERROR", "TIMED_OUT"):
+            self._fail(error or status)
+            self.stop()
+
+    def _on_change(self, payload):
+        data = payload["data"]
+        self.feed.publish(data["table"], str(getattr(data["type"], "value", data["type"])),
+                          data.get("record"), data.get("old_record"))
+
+    def _fail(self, error):
+        log_event('ERROR', f"realtime change feed unavailable: {error}", operation="change_feed")
+        if self.fallback is not None and self.feed is not None and self.feed.source is self:
+            self.feed.switch(self.fallback)
+
+
+# --- Cache subscribers
+def _patch_reference_data(change):
+    if change.type == RESYNC:
+        reference_data.invalidate("categories", "sprints")
+    else:
+        reference_data.apply_change(change.table, change.type, change.record, change.old_record)
+
+
+def _forget_deleted_answers(change):
+    if change.type == DELETE and change.old_record:
+        answer_cache.invalidate_ideas([str(change.old_record.get("id"))])
+
+
+def _log_change(change):
+    log_event('CHANGE', f"{change.type} #{change.seq}", table=change.table, operation="change_feed")
+
+
+_connected = set()
+
+
+def connect_caches(feed=change_feed):
+    """Subscribe the shared caches to ``feed`` (once per feed)"""
+    if id(feed) in _connected:
+        return
+    _connected.add(id(feed))
+    feed.subscribe(_log_change)
+    feed.subscribe(_patch_reference_data, tables=("categories", "sprints"))
+    feed.subscribe(live_items.apply, tables=("items",))
+    feed.subscribe(_forget_deleted_answers, tables=("items",))
+
+
+def start_change_feed(client, supabase_url, supabase_key, mode=CHANGE_FEED, interval=POLL_INTERVAL, feed=change_feed):
+    """Connect the caches and start one source for the process; later calls are no-ops.
+
+    Returns the running source, or None when ``mode`` is "off".
+    """
+    if mode == "off":
+        return feed.source
+    connect_caches(feed)
+    if feed.running:
+        return feed.source
+    polling = PollingSource(client, interval=interval)
+    if mode == "poll":
+        return feed.start(polling)
+    return feed.start(RealtimeSource(supabase_url, supabase_key, fallback=polling))
@@ -0,0 +1,204 @@
+"""Incremental sync of idea embeddings into the ``idea_embeddings`` table.
+
+Only new or changed ideas (by content hash and embedding model) are embedded,
+and vectors for deleted items are removed. Run it standalone as a background
+job so the chat path only has to do the similarity search:
+
+    python -m poppy.embedding_sync --interval 300
+"""
+import argparse
+import hashlib
+import os
+import threading
+import time
+
+from .integration_log import log_event
+
+EMBEDDINGS_TABLE = "idea_embeddings"
+# Primary key was renamed in 20250521_rename_idea_embeddings_id.sql
+EMBEDDING_ID_COLUMN = "embedding_id"
+DEFAULT_EMBEDDING_MODEL = "text-embedding-ada-002"
+DEFAULT_BATCH_SIZE = 100
+PAGE_SIZE = 1000  # PostgREST default max-rows
+
+_background_thread = None
+_background_lock = threading.Lock()
+
+
+def idea_text(idea):
+    """Text that gets embedded for an idea"""
+    return f"{idea['title']}. {idea.get('description') or ''}"
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def content_hash(idea):
+    """Stable hash of the embedded text (title + description)"""
+    return text_hash(idea_text(idea))
+
+
+def embedding_model_name(embeddings):
+    """Model name used by an embeddings object, for change detection"""
+    return getattr(embeddings, "model", None) or DEFAULT_EMBEDDING_MODEL
+
+
+def fetch_all(client, table, columns):
+    """Read every row of a table, paging past the PostgREST row limit"""
+    rows = []
+    start = 0
+    while True:
+        page = client.table(table).select(*columns)\
+            .range(start, start + PAGE_SIZE - 1)\
+            .execute().data or []
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+        start += PAGE_SIZE
+
+
+def plan_sync(ideas, existing, model):
+    """Split ideas into (to_embed, stale_ids) against the stored hashes.
+
+    ``existing`` maps embedding id -> (content_hash, embedding_model).
+    """
+    to_embed = []
+    live_ids = set()
+    for idea in ideas:
+        idea_id = str(idea["id"])
+        live_ids.add(idea_id)
+        digest = content_hash(idea)
+        if existing.get(idea_id) != (digest, model):
+            to_embed.append((idea_id, idea, digest))
+    stale_ids = [idea_id for idea_id in existing if idea_id not in live_ids]
+    return to_embed, stale_ids
+
+
+def embed_ideas(client, embeddings, to_embed, batch_size=DEFAULT_BATCH_SIZE, index=None, model=None):
+    """Embed ``(idea_id, idea, content_hash)`` tuples in batches and upsert the vectors"""
+    model = model or embedding_model_name(embeddings)
+    for i in range(0, len(to_embed), batch_size):
+        batch = to_embed[i:i + batch_size]
+        texts = [idea_text(idea) for _, idea, _ in batch]
+        vectors = embeddings.embed_documents(texts)
+        rows = [
+            {
+                EMBEDDING_ID_COLUMN: idea_id,
+                "content": text,
+                "metadata": {"id": idea_id},
+                "embedding": vector,
+                "content_hash": digest,
+                "embedding_model": model,
+            }
+            for (idea_id, _, digest), text, vector in zip(batch, texts, vectors)
+        ]
+        client.table(EMBEDDINGS_TABLE).upsert(rows).execute()
+        if index is not None:
+            index.add([idea_id for idea_id, _, _ in batch], vectors, texts, [idea for _, idea, _ in batch])
+    return len(to_embed)
+
+
+def sync_idea_embeddings(client, embeddings, batch_size=DEFAULT_BATCH_SIZE, index=None, on_change=None):
+    """Embed new/changed ideas in batches and drop vectors of removed items.
+
+    If a LocalVectorIndex is given it receives the same adds/removes plus
+    fresh status/category/sprint metadata. ``on_change(changed_ids)`` is
+    called with the ids that were re-embedded or removed. Returns a dict of
+    counts plus elapsed seconds.
+    """
+    started = time.time()
+    model = embedding_model_name(embeddings)
+    ideas = fetch_all(client, "items", ["id", "title", "description", "status", "category_id", "sprint_id"])
+    stored = fetch_all(client, EMBEDDINGS_TABLE, [EMBEDDING_ID_COLUMN, "content_hash", "embedding_model"])
+    existing = {
+        str(row[EMBEDDING_ID_COLUMN]): (row.get("content_hash"), row.get("embedding_model"))
+        for row in stored
+    }
+    to_embed, stale_ids = plan_sync(ideas, existing, model)
+    embed_ideas(client, embeddings, to_embed, batch_size, index, model)
+
+    for i in range(0, len(stale_ids), batch_size):
+        client.table(EMBEDDINGS_TABLE).delete()\
+            .in_(EMBEDDING_ID_COLUMN, stale_ids[i:i + batch_size])\
+            .execute()
+
+    if index is not None:
+        index.remove(stale_ids)
+        for idea in ideas:
+            index.update_metadata(idea["id"], idea)
+    if on_change is not None and (to_embed or stale_ids):
+        on_change([idea_id for idea_id, _, _ in to_embed] + stale_ids)
+
+    return {
+        "ideas": len(ideas),
+        "embedded": len(to_embed),
+        "deleted": len(stale_ids),
+        "unchanged": len(ideas) - len(to_embed),
+        "seconds": time.time() - started,
+    }
+
+
+def start_background_sync(client, embeddings, interval, batch_size=DEFAULT_BATCH_SIZE, index=None, on_change=None):
+    """Run sync_idea_embeddings every ``interval`` seconds in a daemon thread.
+
+    Only one thread is started per process; later calls are no-ops.
+    """
+    global _background_thread
+    with _background_lock:
+        if _background_thread is not None and _background_thread.is_alive():
+            return _background_thread
+
+        def loop():
+            while True:
+                try:
+                    sync_idea_embeddings(client, embeddings, batch_size=batch_size, index=index, on_change=on_change)
+                except Exception as e:
+                    log_event('ERROR', f"Embedding sync failed: {e}", table="idea_embeddings", operation="embedding_sync")
+                time.sleep(interval)
+
+        _background_thread = threading.Thread(target=loop, name="embedding-sync", daemon=True)
+        _background_thread.start()
+        return _background_thread
+
+
+def main():
+    from dotenv import load_dotenv
+    from supabase import create_client
+    from langchain_openai import OpenAIEmbeddings
+    from .embedding_cache import CachedEmbeddings
+
+    parser = argparse.ArgumentParser(description="Sync idea embeddings into Supabase")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--interval", type=int, default=0,
+                        help="Repeat every N seconds (0 = run once)")
+    parser.add_argument("--local-index", metavar="PATH",
+                        help="Also maintain a LocalVectorIndex saved at PATH(.npy/.json)")
+    args = parser.parse_args()
+
+    load_dotenv()
+    client = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"])
+    embeddings = CachedEmbeddings(OpenAIEmbeddings(openai_api_key=os.environ["OPENAI_API_KEY"]))
+    index = None
+    if args.local_index:
+        from .vector_index import LocalVectorIndex
+        if os.path.exists(args.local_index + ".json"):
+            index = LocalVectorIndex.load(args.local_index, mmap=False)
+    while True:
+        stats = sync_idea_embeddings(client, embeddings, batch_size=args.batch_size, index=index)
+        if args.local_index:
+            if index is None:
+                index = LocalVectorIndex.from_supabase(client)
+            index.save(args.local_index)
+        print(
+            f"ideas={stats['ideas']} embedded={stats['embedded']} "
+            f"deleted={stats['deleted']} unchanged={stats['unchanged']} "
+            f"in {stats['seconds']:.2f}s"
+        )
+        if not args.interval:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
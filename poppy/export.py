@@ -0,0 +1,243 @@
+"""Streaming export of ``items``, with category and sprint names, to CSV, JSONL or Parquet.
+
+Rows are read in keyset pages ordered by ``(updated_at, id)`` (see
+``item_store.build_changed_items_query``), and each page is written to the
+output file and dropped before the next is fetched, so memory is bounded by
+the page size rather than the table. The same order makes exports
+incremental: ``since`` keeps only rows updated after a previous export's
+watermark, and every export returns the watermark for the next one. From
+the command line (``--incremental`` keeps the watermark in ``--state``):
+
+    python -m poppy.export items.parquet --incremental
+
+Incremental exports are at-least-once: a transaction can commit after an
+export with an ``updated_at`` older than its watermark, so each run re-reads
+``overlap`` seconds before the watermark (``EXPORT_OVERLAP``, as the change
+feed's poller does). Rows in that window can appear in two consecutive
+snapshots; load them by ``id``.
+"""
+import argparse
+import csv
+import datetime
+import io
+import json
+import os
+import time
+
+from .item_store import ITEM_STATUSES, build_changed_items_query
+
+EXPORT_FORMATS = ("csv", "jsonl", "parquet")
+MIME_TYPES = {"csv": "text/csv", "jsonl": "application/x-ndjson", "parquet": "application/vnd.apache.parquet"}
+# PostgREST returns at most 1000 rows per request by default
+DEFAULT_PAGE_SIZE = int(os.environ.get("EXPORT_PAGE_SIZE", "1000"))
+DEFAULT_STATE_PATH = os.environ.get("EXPORT_STATE_PATH", ".cache/export_state.json")
+# Seconds re-read before an incremental watermark, for rows committed late
+DEFAULT_OVERLAP = float(os.environ.get("EXPORT_OVERLAP", "60"))
+# Embedded name columns, flattened into plain columns
+NAME_COLUMNS = {"categories": "category_name", "sprints": "sprint_name"}
+
+
+def _flatten(row):
+    for embed, column in NAME_COLUMNS.items():
+        target = row.pop(embed, None)
+        row[column] = target.get("name") if target else None
+    return row
+
+
+def iter_item_pages(client, filters=None, statuses=None, since=None, page_size=DEFAULT_PAGE_SIZE):
+    """Pages (lists) of flattened item rows, optionally only those updated after ``since``"""
+    cursor = None
+    while True:
+        query = build_changed_items_query(client, filters or {}, statuses, since=since, after=cursor)
+        page = query.limit(page_size).execute().data or []
+        if page:
+            yield [_flatten(row) for row in page]
+        if len(page) < page_size:
+            return
+        cursor = (page[-1].get("updated_at"), page[-1]["id"])
+
+
+# --- Writers: consume pages, write to a binary file, return the number of rows
+def _csv_value(value):
+    return json.dumps(value, default=str) if isinstance(value, (dict, list)) else value
+
+
+def write_csv(pages, fileobj):
+    text = io.TextIOWrapper(fileobj, encoding="utf-8", newline="", write_through=True)
+    writer = None
+    rows = 0
+    for page in pages:
+        if writer is None:
+            writer = csv.DictWriter(text, fieldnames=list(page[0]), extrasaction="ignore")
+            writer.writeheader()
+        writer.writerows({key: _csv_value(value) for key, value in row.items()} for row in page)
+        rows += len(page)
+    text.detach()
+    return rows
+
+
+def write_jsonl(pages, fileobj):
+    rows = 0
+    for page in pages:
+        fileobj.write("".join(json.dumps(row, default=str) + "\n" for row in page).encode("utf-8"))
+        rows += len(page)
+    return rows
+
+
+def write_parquet(pages, fileobj):
+    """One row group per page; the schema comes from the first page (all-NULL columns become strings)"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = schema = None
+    text_columns = ()
+    rows = 0
+    try:
+        for page in pages:
+            if schema is None:
+                inferred = pa.Table.from_pylist(page).schema
+                schema = pa.schema([
+                    pa.field(field.name, pa.string()) if pa.types.is_null(field.type) else field
+                    for field in inferred
+                ])
+                text_columns = [field.name for field in schema if pa.types.is_string(field.type)]
+                writer = pq.ParquetWriter(fileobj, schema)
+            for row in page:
+                for column in text_columns:
+                    value = row.get(column)
+                    if value is not None and not isinstance(value, str):
+                        row[column] = json.dumps(value, default=str)
+            writer.write_table(pa.Table.from_pylist(page, schema=schema))
+            rows += len(page)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        # Nothing changed: still a valid (empty) Parquet file
+        pq.write_table(pa.table({}), fileobj)
+    return rows
+
+
+WRITERS = {"csv": write_csv, "jsonl": write_jsonl, "parquet": write_parquet}
+
+
+def export_format(path, fmt=None):
+    fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower()
+    if fmt == "ndjson":
+        fmt = "jsonl"
+    if fmt not in WRITERS:
+        raise ValueError(f"Unsupported export format {fmt!r}; expected one of {', '.join(EXPORT_FORMATS)}")
+    return fmt
+
+
+def export_items(client, fileobj, fmt, filters=None, statuses=None, since=None, page_size=DEFAULT_PAGE_SIZE,
+                 on_progress=None, overlap=0, max_rows=None):
+    """Stream items into ``fileobj`` (binary); returns stats including the next ``watermark``.
+
+    With ``overlap`` seconds, rows updated up to that long before ``since``
+    are exported again. With ``max_rows``, a ValueError is raised before any
+    page past that many rows is written.
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Unsupported export format {fmt!r}; expected one of {', '.join(EXPORT_FORMATS)}")
+    start_after = since
+    if since is not None and overlap:
+        start_after = (datetime.datetime.fromisoformat(since) - datetime.timedelta(seconds=overlap)).isoformat()
+    stats = {"rows": 0, "pages": 0, "since": start_after, "watermark": since}
+    started = time.perf_counter()
+
+    def tracked():
+        for page in iter_item_pages(client, filters, statuses, start_after, page_size):
+            if max_rows is not None and stats["rows"] + len(page) > max_rows:
+                raise ValueError(f"More than {max_rows} rows to export; use python -m poppy.export")
+            stats["pages"] += 1
+            stats["rows"] += len(page)
+            # Pages arrive in updated_at order with NULLs last: the latest timestamp is the last non-NULL one
+            latest = next((row["updated_at"] for row in reversed(page) if row.get("updated_at")), None)
+            # Rows from the overlap window must not move the watermark backwards
+            if latest is not None and (stats["watermark"] is None or _later(latest, stats["watermark"])):
+                stats["watermark"] = latest
+            yield page
+            if on_progress is not None:
+                on_progress(stats)
+
+    WRITERS[fmt](tracked(), fileobj)
+    stats["seconds"] = time.perf_counter() - started
+    stats["rows_per_second"] = stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+    return stats
+
+
+# --- Incremental state
+def _later(a, b):
+    return datetime.datetime.fromisoformat(a) > datetime.datetime.fromisoformat(b)
+
+
+def load_watermark(state_path):
+    """``updated_at`` of the last exported row, or None before the first export"""
+    try:
+        with open(state_path, encoding="utf-8") as f:
+            return json.load(f).get("watermark")
+    except FileNotFoundError:
+        return None
+
+
+def save_watermark(state_path, stats):
+    directory = os.path.dirname(state_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    state = {
+        "watermark": stats["watermark"],
+        "rows": stats["rows"],
+        "exported_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+    }
+    tmp = f"{state_path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, state_path)
+
+
+def main():
+    from dotenv import load_dotenv
+    from supabase import create_client
+
+    parser = argparse.ArgumentParser(description="Export items with category and sprint names")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, help="Defaults to the file extension")
+    parser.add_argument("--since", help="Only rows updated after this ISO timestamp")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only rows updated after the previous --incremental export (see --state)")
+    parser.add_argument("--state", default=DEFAULT_STATE_PATH, help="Watermark file for --incremental")
+    parser.add_argument("--overlap", type=float, default=DEFAULT_OVERLAP,
+                        help="Seconds re-read before the --incremental watermark (at-least-once)")
+    parser.add_argument("--status", action="append", choices=ITEM_STATUSES, help="Only these statuses (repeatable)")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    args = parser.parse_args()
+
+    fmt = export_format(args.path, args.format)
+    since = args.since or (load_watermark(args.state) if args.incremental else None)
+    load_dotenv()
+    client = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"])
+
+    def progress(stats):
+        print(f"  {stats['rows']} rows", flush=True)
+
+    # Written next to the target and moved into place, so a failed run leaves no partial file
+    tmp = f"{args.path}.partial"
+    try:
+        with open(tmp, "wb") as f:
+            stats = export_items(client, f, fmt, statuses=args.status, since=since, page_size=args.page_size,
+                                 on_progress=progress, overlap=args.overlap if args.incremental and not args.since else 0)
+        os.replace(tmp, args.path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    if args.incremental:
+        save_watermark(args.state, stats)
+    print(
+        f"exported={stats['rows']} pages={stats['pages']} since={stats['since'] or '-'} "
+        f"watermark={stats['watermark'] or '-'} in {stats['seconds']:.2f}s ({stats['rows_per_second']:.0f} rows/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
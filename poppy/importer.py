@@ -0,0 +1,251 @@
+"""Streaming bulk import of ideas into ``items`` from CSV, YAML or PDF.
+
+Each parser is a generator of raw records, so large files are read and
+inserted a chunk at a time instead of being loaded whole. Records are
+validated, categories are mapped to ids through the shared lookup cache,
+rows go in with one bulk insert per chunk, and the inserted ideas are
+embedded in batches. From the command line:
+
+    python -m poppy.importer ideas.csv --chunk-size 500
+"""
+import argparse
+import csv
+import io
+import os
+import re
+import time
+
+from .embedding_sync import DEFAULT_BATCH_SIZE, content_hash, embed_ideas
+from .item_store import ITEM_STATUSES
+from .reference_data import reference_data
+
+IMPORT_FORMATS = ("csv", "yaml", "pdf")
+PRIORITIES = ("low", "medium", "high", "urgent")
+DEFAULT_CHUNK_SIZE = int(os.environ.get("IMPORT_CHUNK_SIZE", "500"))
+MAX_REPORTED_ERRORS = 20
+# PDF lines that start a new idea: "- ", "* ", "• ", "1. ", "2) "
+_BULLET = re.compile(r"^\s*(?:[-*•▪◦]|\d+[.)])\s+(.*)$")
+
+
+def _text_stream(fileobj):
+    if isinstance(fileobj, io.TextIOBase):
+        return fileobj
+    return io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+
+
+def iter_csv(fileobj):
+    """One dict per row, keyed by the (lower-cased) header"""
+    for row in csv.DictReader(_text_stream(fileobj)):
+        yield {(key or "").strip().lower(): value for key, value in row.items()}
+
+
+def _yaml_record(record):
+    return {"title": record} if isinstance(record, str) else record
+
+
+def _iter_yaml_sequence(loader, yaml):
+    """Construct the items of the sequence at the current event one at a time"""
+    loader.get_event()
+    while not loader.check_event(yaml.SequenceEndEvent):
+        yield loader.construct_document(loader.compose_node(None, None))
+    loader.get_event()
+
+
+def iter_yaml(fileobj):
+    """Ideas from one or more YAML documents: a list of ideas, or {"ideas": [...]}.
+
+    Parsed from events, so only one idea is held at a time even when a
+    single document lists them all.
+    """
+    import yaml
+    loader = yaml.SafeLoader(_text_stream(fileobj))
+    try:
+        loader.get_event()  # StreamStart
+        while not loader.check_event(yaml.StreamEndEvent):
+            loader.get_event()  # DocumentStart
+            if loader.check_event(yaml.SequenceStartEvent):
+                for record in _iter_yaml_sequence(loader, yaml):
+                    yield _yaml_record(record)
+            elif loader.check_event(yaml.MappingStartEvent):
+                # {"ideas": [...]} streams the list; any other mapping is a single idea
+                loader.get_event()
+                record, has_ideas = {}, False
+                while not loader.check_event(yaml.MappingEndEvent):
+                    key = loader.construct_document(loader.compose_node(None, None))
+                    if key == "ideas" and loader.check_event(yaml.SequenceStartEvent):
+                        has_ideas = True
+                        for idea in _iter_yaml_sequence(loader, yaml):
+                            yield _yaml_record(idea)
+                    else:
+                        value = loader.construct_document(loader.compose_node(None, None))
+                        has_ideas = has_ideas or key == "ideas"
+                        record[key] = value
+                loader.get_event()
+                if not has_ideas:
+                    yield record
+            else:
+                value = loader.construct_document(loader.compose_node(None, None))
+                if value is not None:
+                    yield _yaml_record(value)
+            loader.get_event()  # DocumentEnd
+            loader.anchors = {}
+    finally:
+        loader.dispose()
+
+
+def iter_pdf(fileobj):
+    """Bulleted or numbered lines start an idea; following lines become its description"""
+    from pypdf import PdfReader
+    current = None
+    for page in PdfReader(fileobj).pages:
+        for line in (page.extract_text() or "").splitlines():
+            match = _BULLET.match(line)
+            if match:
+                if current:
+                    yield current
+                current = {"title": match.group(1).strip(), "description": ""}
+            elif current and line.strip():
+                current["description"] = f"{current['description']} {line.strip()}".strip()
+    if current:
+        yield current
+
+
+PARSERS = {"csv": iter_csv, "yaml": iter_yaml, "pdf": iter_pdf}
+
+
+def detect_format(filename):
+    ext = os.path.splitext(filename)[1].lower().lstrip(".")
+    fmt = "yaml" if ext == "yml" else ext
+    if fmt not in PARSERS:
+        raise ValueError(f"Unsupported file type: {filename} (expected one of {', '.join(IMPORT_FORMATS)})")
+    return fmt
+
+
+def to_item(record, categories, default_status="idea"):
+    """Validated ``items`` row for a parsed record; raises ValueError if it cannot be imported"""
+    if not isinstance(record, dict):
+        raise ValueError(f"expected a mapping of fields, got {type(record).__name__}")
+    title = str(record.get("title") or "").strip()
+    if not title:
+        raise ValueError("missing title")
+    status = str(record.get("status") or default_status).strip().lower().replace(" ", "_")
+    if status not in ITEM_STATUSES:
+        raise ValueError(f"unknown status {status!r}")
+    priority = str(record.get("priority") or "medium").strip().lower()
+    if priority not in PRIORITIES:
+        raise ValueError(f"unknown priority {priority!r}")
+    try:
+        points = int(float(record.get("points") or 0))
+    except (TypeError, ValueError):
+        raise ValueError(f"invalid points {record.get('points')!r}")
+    category = str(record.get("category") or "").strip()
+    category_id = None
+    if category:
+        category_id = categories.get(category.lower())
+        if category_id is None:
+            raise ValueError(f"unknown category {category!r}")
+    return {
+        "title": title,
+        "description": str(record.get("description") or "").strip(),
+        "status": status,
+        "priority": priority,
+        "category_id": category_id,
+        "points": max(points, 0),
+    }
+
+
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def import_items(client, records, embeddings=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                 embed_batch_size=DEFAULT_BATCH_SIZE, default_status="idea", on_progress=None):
+    """Insert parsed records in chunks and embed what was inserted.
+
+    ``on_progress(stats)`` is called after every chunk. Returns the stats
+    dict: counts, the first few row errors, and rows/second.
+    """
+    started = time.perf_counter()
+    lookup = reference_data.get(client, "categories")
+    categories = {name.lower(): category_id for name, category_id in lookup.by_name.items()}
+    stats = {"parsed": 0, "inserted": 0, "skipped": 0, "embedded": 0, "chunks": 0, "statuses": set(), "errors": []}
+
+    def rows():
+        for record in records:
+            stats["parsed"] += 1
+            try:
+                yield to_item(record, categories, default_status)
+            except ValueError as e:
+                stats["skipped"] += 1
+                if len(stats["errors"]) < MAX_REPORTED_ERRORS:
+                    stats["errors"].append(f"record {stats['parsed']}: {e}")
+
+    for chunk in chunked(rows(), chunk_size):
+        inserted = client.table("items").insert(chunk).execute().data or []
+        stats["inserted"] += len(inserted)
+        stats["chunks"] += 1
+        stats["statuses"].update(row["status"] for row in chunk)
+        if embeddings is not None and inserted:
+            to_embed = [(str(row["id"]), row, content_hash(row)) for row in inserted]
+            stats["embedded"] += embed_ideas(client, embeddings, to_embed, embed_batch_size)
+        if on_progress is not None:
+            on_progress(stats)
+
+    stats["seconds"] = time.perf_counter() - started
+    stats["rows_per_second"] = stats["inserted"] / stats["seconds"] if stats["seconds"] else 0.0
+    return stats
+
+
+def import_file(client, fileobj, filename, embeddings=None, fmt=None, **kwargs):
+    """Parse and import one file; ``fmt`` defaults to the file extension"""
+    return import_items(client, PARSERS[fmt or detect_format(filename)](fileobj), embeddings, **kwargs)
+
+
+def main():
+    from dotenv import load_dotenv
+    from supabase import create_client
+
+    parser = argparse.ArgumentParser(description="Bulk import ideas into items")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="Defaults to the file extension")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--embed-batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--status", default="idea", choices=ITEM_STATUSES,
+                        help="Status for records that do not set one")
+    parser.add_argument("--no-embed", action="store_true", help="Leave embedding to the sync job")
+    args = parser.parse_args()
+
+    load_dotenv()
+    client = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"])
+    embeddings = None
+    if not args.no_embed:
+        from langchain_openai import OpenAIEmbeddings
+        from .embedding_cache import CachedEmbeddings
+        embeddings = CachedEmbeddings(OpenAIEmbeddings(openai_api_key=os.environ["OPENAI_API_KEY"]))
+
+    def progress(stats):
+        print(f"  {stats['inserted']} inserted, {stats['skipped']} skipped", flush=True)
+
+    with open(args.path, "rb") as f:
+        stats = import_file(
+            client, f, args.path, embeddings, fmt=args.format, chunk_size=args.chunk_size,
+            embed_batch_size=args.embed_batch_size, default_status=args.status, on_progress=progress,
+        )
+    for error in stats["errors"]:
+        print(f"  skipped {error}")
+    print(
+        f"parsed={stats['parsed']} inserted={stats['inserted']} skipped={stats['skipped']} "
+        f"embedded={stats['embedded']} chunks={stats['chunks']} "
+        f"in {stats['seconds']:.2f}s ({stats['rows_per_second']:.0f} rows/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Integration event log for Supabase calls.
+
+Events go to a fixed-size in-memory ring buffer (and optionally a rotating
+JSONL file). Details may be passed as a callable and are only rendered when
+read. Queries reach the log through ``query_middleware``.
+"""
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+
+LOG_CAPACITY = int(os.environ.get("INTEGRATION_LOG_CAPACITY", "1000"))
+MAX_DETAIL_CHARS = 300
+# Optional on-disk history: one JSON object per line, rotated by size
+JSONL_PATH = os.environ.get("INTEGRATION_LOG_JSONL")
+JSONL_MAX_BYTES = int(os.environ.get("INTEGRATION_LOG_JSONL_MAX_BYTES", str(10 * 1024 * 1024)))
+JSONL_BACKUPS = int(os.environ.get("INTEGRATION_LOG_JSONL_BACKUPS", "5"))
+
+
+class LogEvent:
+    """One compact integration log record"""
+    __slots__ = ("ts", "event_type", "table", "operation", "row_count", "byte_size", "_details", "suggestion")
+    FIELDS = ("ts", "event_type", "table", "operation", "row_count", "byte_size", "details", "suggestion")
+
+    def __init__(self, ts, event_type, details, table=None, operation=None, row_count=None, byte_size=None,
+                 suggestion=None):
+        self.ts = ts
+        self.event_type = event_type
+        self.table = table
+        self.operation = operation
+        self.row_count = row_count
+        self.byte_size = byte_size
+        # str, or a callable rendered (and truncated) on first read
+        self._details = details
+        self.suggestion = suggestion
+
+    @property
+    def details(self):
+        if callable(self._details):
+            self._details = self._details()[:MAX_DETAIL_CHARS]
+        return self._details
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+
+class RingBuffer:
+    """Fixed-capacity buffer that overwrites the oldest entry when full"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._items = [None] * capacity
+        self._next = 0
+        self._count = 0
+
+    def append(self, item):
+        self._items[self._next] = item
+        self._next = (self._next + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def tail(self, n):
+        """Newest ``n`` entries, oldest first"""
+        n = min(n, self._count)
+        start = (self._next - n) % self.capacity
+        if start + n <= self.capacity:
+            return self._items[start:start + n]
+        return self._items[start:] + self._items[:self._next]
+
+    def clear(self):
+        self._items = [None] * self.capacity
+        self._next = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+
+# Global log storage (thread-safe)
+_integration_log = RingBuffer(LOG_CAPACITY)
+_log_lock = threading.Lock()
+
+_jsonl_logger = None
+if JSONL_PATH:
+    _jsonl_logger = logging.getLogger("poppy.integration_log")
+    _jsonl_logger.propagate = False
+    _jsonl_handler = logging.handlers.RotatingFileHandler(
+        JSONL_PATH, maxBytes=JSONL_MAX_BYTES, backupCount=JSONL_BACKUPS, encoding="utf-8"
+    )
+    _jsonl_handler.setFormatter(logging.Formatter("%(message)s"))
+    _jsonl_logger.addHandler(_jsonl_handler)
+    _jsonl_logger.setLevel(logging.INFO)
+
+
+def log_event(event_type, details, table=None, operation=None, row_count=None, byte_size=None, payload=None,
+              suggestion=None):
+    """Record an event; ``payload`` (full text, or a callable) only goes to the JSONL sink"""
+    event = LogEvent(time.time(), event_type, details if callable(details) else details[:MAX_DETAIL_CHARS],
+                     table, operation, row_count, byte_size, suggestion)
+    with _log_lock:
+        _integration_log.append(event)
+    if _jsonl_logger is not None:
+        record = event.as_dict()
+        full = payload if payload is not None else details
+        record["details"] = full() if callable(full) else full
+        _jsonl_logger.info(json.dumps(record, default=str))
+    return event
+
+
+def recent_events(n=100):
+    """Newest ``n`` events, oldest first"""
+    with _log_lock:
+        return _integration_log.tail(n)
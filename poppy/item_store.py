@@ -0,0 +1,439 @@
+"""Session-scoped views of ``items`` for the status tabs.
+
+``ItemSnapshot`` fetches every tab in one filtered query and partitions it
+by status; writes invalidate only the partitions they touch, and the next
+refresh re-fetches just those.
+
+``ItemPager`` is the listing mode for large backlogs: one page of one
+status at a time, keyset-paginated on ``(rank, id)`` with only the
+displayed columns, a planner-estimated count for the tab total, and descriptions
+loaded on demand.
+
+With the change feed running (change_feed.py), both catch up on other
+sessions' writes by sequence number, and ``live_items`` keeps every item
+row in memory so snapshots rebuild changed tabs without a query.
+"""
+import os
+import threading
+
+import pandas as pd
+
+from .reference_data import reference_data
+
+ITEM_STATUSES = ["idea", "backlog", "in_progress", "done", "blocked"]
+ITEM_COLUMNS = ("*", "categories(name)", "sprints(name)")
+# Sidebar filters (besides the status tab)
+FILTER_COLUMNS = ("priority", "category_id", "sprint_id")
+# Columns shown in the item table (description is fetched lazily)
+LIST_COLUMNS = (
+    "id", "title", "status", "priority", "points", "rank",
+    "category_id", "sprint_id", "categories(name)", "sprints(name)",
+)
+PAGE_SIZE = int(os.environ.get("ITEM_PAGE_SIZE", "100"))
+LIVE_LOAD_PAGE = 1000
+
+
+def _apply_filters(query, filters, statuses=None):
+    if statuses is not None:
+        query = query.in_("status", list(statuses))
+    if filters.get("priority"):
+        query = query.eq("priority", filters["priority"])
+    if filters.get("category_id"):
+        query = query.eq("category_id", filters["category_id"])
+    if filters.get("sprint_id"):
+        query = query.eq("sprint_id", filters["sprint_id"])
+    return query
+
+
+def row_matches(row, filters):
+    """Whether one item row passes the sidebar filters (``_apply_filters`` in Python)"""
+    for column in FILTER_COLUMNS:
+        if filters.get(column) and str(row.get(column)) != str(filters[column]):
+            return False
+    return True
+
+
+def affected_statuses(changes, filters, complete=True, statuses=ITEM_STATUSES):
+    """Status tabs under ``filters`` whose rows may differ after the change feed ``changes``.
+
+    Every tab is affected when changes were missed, when a category or sprint
+    changed (their names are embedded in item rows), or when a change doesn't
+    say which tab the row left.
+    """
+    if not complete:
+        return set(statuses)
+    affected = set()
+    for change in changes:
+        if change.type == "RESYNC" or change.table in ("categories", "sprints"):
+            return set(statuses)
+        if change.table != "items":
+            continue
+        rows = [change.record] if change.record else []
+        if change.type != "INSERT":
+            if not change.old_record or "status" not in change.old_record:
+                return set(statuses)
+            rows.append(change.old_record)
+        affected.update(row["status"] for row in rows if row_matches(row, filters))
+    return affected & set(statuses)
+
+
+def keyset_condition(cursor):
+    """PostgREST ``or`` filter for rows after ``(rank, id)`` in (rank desc, id desc) order.
+
+    Descending order puts NULL ranks first, so a NULL-rank cursor continues
+    through the remaining NULLs and then every ranked row.
+    """
+    rank, item_id = cursor
+    if rank is None:
+        return f"and(rank.is.null,id.lt.{item_id}),rank.not.is.null"
+    return f"rank.lt.{rank},and(rank.eq.{rank},id.lt.{item_id})"
+
+
+def build_items_query(client, filters, statuses=None, columns=ITEM_COLUMNS, after=None):
+    """Items query with the sidebar filters applied, ordered by rank.
+
+    ``filters`` may hold ``priority``, ``category_id`` and ``sprint_id``;
+    missing or None values are not filtered on. ``after`` is a ``(rank, id)``
+    keyset cursor; only rows that sort after it are returned.
+    """
+    query = _apply_filters(client.table("items").select(*columns), filters, statuses)
+    if after is not None:
+        query = query.or_(keyset_condition(after))
+    return query.order("rank", desc=True).order("id", desc=True)
+
+
+def updated_after_condition(cursor):
+    """PostgREST ``or`` filter for rows after ``(updated_at, id)`` in (updated_at asc, id asc) order.
+
+    Ascending order puts NULL timestamps last, so a non-NULL cursor also
+    lets through every NULL row, and a NULL cursor continues within them.
+    """
+    updated_at, item_id = cursor
+    if updated_at is None:
+        return f"and(updated_at.is.null,id.gt.{item_id})"
+    return f"updated_at.gt.{updated_at},and(updated_at.eq.{updated_at},id.gt.{item_id}),updated_at.is.null"
+
+
+def build_changed_items_query(client, filters, statuses=None, columns=ITEM_COLUMNS, since=None, after=None):
+    """Items query with the sidebar filters applied, oldest change first.
+
+    ``since`` keeps only rows whose ``updated_at`` is later; ``after`` is an
+    ``(updated_at, id)`` keyset cursor, as for ``build_items_query``.
+    """
+    query = _apply_filters(client.table("items").select(*columns), filters, statuses)
+    if since is not None:
+        query = query.gt("updated_at", since)
+    if after is not None:
+        query = query.or_(updated_after_condition(after))
+    return query.order("updated_at").order("id")
+
+
+def count_method(filters):
+    """PostgREST count method for a status tab under ``filters``.
+
+    ``planned`` (the planner's estimate, no scan) is close for a whole tab,
+    but combined filters are estimated badly; filtered tabs get an ``exact``
+    count, which reads only that tab's rows (``idx_items_status_rank``).
+    """
+    return "exact" if any(filters.get(column) for column in FILTER_COLUMNS) else "planned"
+
+
+def count_items(client, filters, status, method=None):
+    """Number of items in one status tab, without fetching any rows (``count_method`` by default)"""
+    query = client.table("items").select("id", count=method or count_method(filters), head=True)
+    return _apply_filters(query, filters, [status]).execute().count or 0
+
+
+def fetch_descriptions(client, item_ids):
+    """{id: description} for the given items"""
+    if not item_ids:
+        return {}
+    rows = client.table("items").select("id", "description").in_("id", list(item_ids)).execute().data or []
+    return {str(row["id"]): row.get("description") or "" for row in rows}
+
+
+def edge_rank(client, filters, status, top=True):
+    """Highest (``top``) or lowest non-null rank in a status tab, or None"""
+    query = _apply_filters(client.table("items").select("rank"), filters, [status])
+    rows = query.not_.is_("rank", "null").order("rank", desc=top).limit(1).execute().data or []
+    return rows[0]["rank"] if rows else None
+
+
+class LiveItems:
+    """Every item row, loaded once per process and kept current by the change feed"""
+
+    def __init__(self, page_size=LIVE_LOAD_PAGE):
+        self.page_size = page_size
+        self.rows = {}
+        self.loaded = False
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        # Changes that arrive while a load is in flight, replayed on top of it
+        self._pending = None
+        self.loads = 0
+        self.applied = 0
+
+    def ensure_loaded(self, client):
+        """Load all items (keyset pages of ``page_size``) unless already loaded"""
+        if self.loaded:
+            return
+        with self._load_lock:
+            if self.loaded:
+                return
+            with self._lock:
+                self._pending = []
+            try:
+                rows = {}
+                cursor = None
+                while True:
+                    page = build_items_query(client, {}, columns=("*",), after=cursor)\
+                        .limit(self.page_size).execute().data or []
+                    rows.update((str(row["id"]), row) for row in page)
+                    if len(page) < self.page_size:
+                        break
+                    cursor = (page[-1]["rank"], str(page[-1]["id"]))
+            except Exception:
+                with self._lock:
+                    self._pending = None
+                raise
+            with self._lock:
+                pending, self._pending = self._pending, None
+                self.rows = rows
+                for change in pending:
+                    self._apply(change)
+                self.loaded = not any(change.type == "RESYNC" for change in pending)
+                self.loads += 1
+
+    def apply(self, change):
+        """Change feed subscriber for ``items``"""
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(change)
+            elif change.type == "RESYNC":
+                self.loaded = False
+                self.rows = {}
+            elif self.loaded:
+                self._apply(change)
+
+    def _apply(self, change):
+        if change.type == "DELETE":
+            self.rows.pop(str((change.old_record or {}).get("id")), None)
+        elif change.type != "RESYNC":
+            key = str(change.record["id"])
+            self.rows[key] = {**self.rows.get(key, {}), **change.record}
+        self.applied += 1
+
+    def frames(self, client, filters, statuses):
+        """{status: DataFrame} shaped and ordered like ``build_items_query`` results"""
+        categories = reference_data.get(client, "categories")
+        sprints = reference_data.get(client, "sprints")
+        wanted = set(statuses)
+        with self._lock:
+            rows = [row for row in self.rows.values() if row.get("status") in wanted and row_matches(row, filters)]
+        # rank desc (NULLs first), then id desc
+        rows.sort(key=lambda row: str(row["id"]), reverse=True)
+        rows.sort(key=lambda row: (row.get("rank") is None, row.get("rank") or 0), reverse=True)
+        parts = {status: [] for status in statuses}
+        for row in rows:
+            category = categories.row_for(row.get("category_id"))
+            sprint = sprints.row_for(row.get("sprint_id"))
+            parts[row["status"]].append({
+                **row,
+                "categories": {"name": category["name"]} if category else None,
+                "sprints": {"name": sprint["name"]} if sprint else None,
+            })
+        return {status: pd.DataFrame(part) for status, part in parts.items()}
+
+
+live_items = LiveItems()
+
+
+class ItemSnapshot:
+    """Items for one filter combination, split into per-status DataFrames"""
+
+    def __init__(self, filters, statuses=ITEM_STATUSES):
+        self.filters = dict(filters)
+        self.statuses = list(statuses)
+        self.partitions = {}
+        self.stale = set(self.statuses)
+        # Written by this session: re-query rather than trust live rows that may lag the write
+        self.requery = set()
+        # Change feed sequence number this snapshot has caught up to
+        self.seq = 0
+        self.fetches = 0
+
+    def matches(self, filters):
+        return self.filters == dict(filters)
+
+    def invalidate(self, *statuses):
+        """Mark partitions for re-fetch; no arguments marks all of them"""
+        statuses = statuses or self.statuses
+        self.stale.update(statuses)
+        self.requery.update(statuses)
+
+    def catch_up(self, feed):
+        """Mark partitions stale that other writers changed since the last refresh"""
+        self.seq, changes, complete = feed.changes_since(self.seq)
+        self.stale.update(affected_statuses(changes, self.filters, complete, self.statuses))
+
+    def refresh(self, client, live=None):
+        """Rebuild stale partitions from ``live`` rows, or re-fetch them in a single query.
+
+        Returns True if it queried.
+        """
+        if not self.stale:
+            return False
+        stale = [status for status in self.statuses if status in self.stale]
+        from_live = [status for status in stale if status not in self.requery] if live is not None else []
+        if from_live:
+            self.partitions.update(live.frames(client, self.filters, from_live))
+        queried = [status for status in stale if status not in from_live]
+        if queried:
+            rows = build_items_query(client, self.filters, statuses=queried).execute().data or []
+            self.fetches += 1
+            df = pd.DataFrame(rows)
+            groups = dict(tuple(df.groupby("status", sort=False))) if not df.empty else {}
+            for status in queried:
+                part = groups.get(status)
+                self.partitions[status] = part.reset_index(drop=True) if part is not None else pd.DataFrame()
+        self.stale.clear()
+        self.requery.clear()
+        return bool(queried)
+
+    def get(self, status):
+        return self.partitions.get(status, pd.DataFrame())
+
+
+class ItemPager:
+    """One keyset-paginated page of a status tab, with its total count"""
+
+    def __init__(self, filters, status, page_size=PAGE_SIZE, columns=LIST_COLUMNS):
+        self.filters = dict(filters)
+        self.status = status
+        self.page_size = page_size
+        self.columns = columns
+        # Cursor at the start of every page visited so far; None is the first page
+        self.cursors = [None]
+        self.page = pd.DataFrame()
+        self.has_more = False
+        self.count = None
+        # False while ``count`` is an estimate
+        self.count_exact = False
+        self.descriptions = {}
+        self.stale = True
+        self.seq = 0
+        self.fetches = 0
+
+    @property
+    def page_number(self):
+        return len(self.cursors)
+
+    @property
+    def count_text(self):
+        """Tab total for labels; "~" marks an estimate"""
+        return str(self.count) if self.count_exact else f"~{self.count}"
+
+    def matches(self, filters):
+        return self.filters == dict(filters)
+
+    def invalidate(self):
+        self.stale = True
+        self.count = None
+        self.descriptions.clear()
+
+    def catch_up(self, feed):
+        """Invalidate if other writers changed this tab since the last refresh"""
+        self.seq, changes, complete = feed.changes_since(self.seq)
+        if self.status in affected_statuses(changes, self.filters, complete):
+            self.invalidate()
+
+    def refresh(self, client):
+        """Re-fetch the current page (one row extra to detect a next page) and the total"""
+        if not self.stale:
+            return False
+        rows = build_items_query(
+            client, self.filters, statuses=[self.status], columns=self.columns, after=self.cursors[-1]
+        ).limit(self.page_size + 1).execute().data or []
+        self.fetches += 1
+        self.has_more = len(rows) > self.page_size
+        self.page = pd.DataFrame(rows[:self.page_size])
+        if self.page.empty and self.page_number > 1:
+            # The page emptied under us (deletes/moves); step back
+            self.cursors.pop()
+            return self.refresh(client)
+        seen = (self.page_number - 1) * self.page_size + len(self.page)
+        if not self.has_more:
+            # On the last page the total is known without a count query
+            self.count, self.count_exact = seen, True
+        elif self.count is None:
+            # An estimate can be off; never below the rows already paged past
+            method = count_method(self.filters)
+            self.count = max(count_items(client, self.filters, self.status, method), seen + 1)
+            self.count_exact = method == "exact"
+        self.stale = False
+        return True
+
+    def next_page(self):
+        if not self.has_more or self.page.empty:
+            return
+        last = self.page.iloc[-1]
+        rank = None if pd.isna(last["rank"]) else int(last["rank"])
+        self.cursors.append((rank, str(last["id"])))
+        self.stale = True
+
+    def previous_page(self):
+        if self.page_number > 1:
+            self.cursors.pop()
+            self.stale = True
+
+    def get_descriptions(self, client, item_ids):
+        """Descriptions for rows on this page, fetched once per id"""
+        item_ids = [str(item_id) for item_id in item_ids]
+        missing = [item_id for item_id in item_ids if item_id not in self.descriptions]
+        self.descriptions.update(fetch_descriptions(client, missing))
+        return {item_id: self.descriptions.get(item_id, "") for item_id in item_ids}
+
+
+def resolve_filters(client, priority="All", category="All", sprint="All"):
+    """Item query filters from sidebar selections (names; "All" means unfiltered)"""
+    filters = {"priority": None, "category_id": None, "sprint_id": None}
+    if priority != "All":
+        filters["priority"] = priority
+    if category != "All":
+        filters["category_id"] = reference_data.get(client, "categories").id_for(category)
+    if sprint != "All":
+        filters["sprint_id"] = reference_data.get(client, "sprints").id_for(sprint)
+    return filters
+
+
+def load_snapshot(client, snapshot, filters, feed=None, live=None):
+    """Refresh ``snapshot``, or a new one if it was for other filters.
+
+    With a running change ``feed`` the snapshot also catches up on other
+    sessions' writes; ``live`` (kept current by that feed) serves stale
+    partitions from memory.
+    """
+    if snapshot is None or not snapshot.matches(filters):
+        snapshot = ItemSnapshot(filters)
+        if feed is not None:
+            snapshot.seq = feed.seq
+    elif feed is not None:
+        snapshot.catch_up(feed)
+    if live is not None:
+        live.ensure_loaded(client)
+    snapshot.refresh(client, live)
+    return snapshot
+
+
+def load_pagers(client, pagers, filters, feed=None):
+    """Refresh {status: ItemPager}, or new pagers if they were for other filters"""
+    if pagers is None or not all(pager.matches(filters) for pager in pagers.values()):
+        pagers = {status: ItemPager(filters, status) for status in ITEM_STATUSES}
+        for pager in pagers.values():
+            pager.seq = feed.seq if feed is not None else 0
+    elif feed is not None:
+        for pager in pagers.values():
+            pager.catch_up(feed)
+    for pager in pagers.values():
+        pager.refresh(client)
+    return pagers
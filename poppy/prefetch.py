@@ -0,0 +1,38 @@
+"""Run independent startup reads concurrently.
+
+``prefetch`` submits every task to a shared thread pool and waits for each
+one up to its own timeout. Results and failures are returned separately so
+one slow or failing table does not block the rest of the page.
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+
+from .query_metrics import query_metrics
+
+PREFETCH_WORKERS = int(os.environ.get("PREFETCH_WORKERS", "8"))
+PREFETCH_TIMEOUT = float(os.environ.get("PREFETCH_TIMEOUT", "10"))
+
+_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch")
+
+
+def prefetch(tasks, timeout=PREFETCH_TIMEOUT, timeouts=None):
+    """Run {name: callable} in parallel; returns (results, errors) dicts.
+
+    ``timeouts`` may override the timeout per task. A task that times out
+    keeps running in the background but its result is discarded.
+    """
+    timeouts = timeouts or {}
+    started = time.monotonic()
+    futures = {name: _executor.submit(query_metrics.bind(fn)) for name, fn in tasks.items()}
+    results, errors = {}, {}
+    for name, future in futures.items():
+        limit = timeouts.get(name, timeout)
+        remaining = max(0.0, started + limit - time.monotonic())
+        try:
+            results[name] = future.result(timeout=remaining)
+        except FuturesTimeout:
+            errors[name] = TimeoutError(f"{name} timed out after {limit:.0f}s")
+        except Exception as e:
+            errors[name] = e
+    return results, errors
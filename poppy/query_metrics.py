@@ -0,0 +1,201 @@
+"""Latency/size metrics for Supabase queries, vector searches and LLM calls.
+
+Every timed call is recorded per (table, operation) with a fixed-bucket
+histogram (for Prometheus) and a bounded window of recent samples (for
+p50/p95/p99). Calls are also grouped by Streamlit rerun: the app calls
+``begin_rerun()`` at the top of the script and everything timed on that
+thread until the next ``begin_rerun()`` is attributed to it.
+"""
+import json
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Histogram upper bounds in seconds (+Inf is implicit)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SAMPLE_WINDOW = 1024
+RERUN_HISTORY = 20
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class OperationStats:
+    __slots__ = ("count", "errors", "total_seconds", "bytes", "buckets", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.bytes = 0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.samples = deque(maxlen=SAMPLE_WINDOW)
+
+    def observe(self, seconds, nbytes, error):
+        self.count += 1
+        self.errors += 1 if error else 0
+        self.total_seconds += seconds
+        self.bytes += nbytes
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+        self.samples.append(seconds)
+
+    def summary(self):
+        ordered = sorted(self.samples)
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "total_ms": self.total_seconds * 1000,
+            "bytes": self.bytes,
+            "p50_ms": percentile(ordered, 50) * 1000,
+            "p95_ms": percentile(ordered, 95) * 1000,
+            "p99_ms": percentile(ordered, 99) * 1000,
+        }
+
+
+class Rerun:
+    __slots__ = ("rerun_id", "label", "started", "calls", "total_seconds", "bytes", "by_table")
+
+    def __init__(self, rerun_id, label):
+        self.rerun_id = rerun_id
+        self.label = label
+        self.started = time.time()
+        self.calls = 0
+        self.total_seconds = 0.0
+        self.bytes = 0
+        self.by_table = {}
+
+    def summary(self):
+        return {
+            "rerun_id": self.rerun_id,
+            "label": self.label,
+            "started": self.started,
+            "calls": self.calls,
+            "total_ms": self.total_seconds * 1000,
+            "bytes": self.bytes,
+            "by_table": dict(self.by_table),
+        }
+
+
+class QueryMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._reruns = deque(maxlen=RERUN_HISTORY)
+        self._current = threading.local()
+        self._next_rerun_id = 1
+
+    def begin_rerun(self, label=""):
+        """Start attributing calls on this thread to a new rerun"""
+        with self._lock:
+            rerun = Rerun(self._next_rerun_id, label)
+            self._next_rerun_id += 1
+            self._reruns.append(rerun)
+        self._current.rerun = rerun
+        return rerun
+
+    def bind(self, fn):
+        """Wrap ``fn`` so calls it makes on another thread count towards this thread's rerun"""
+        rerun = getattr(self._current, "rerun", None)
+
+        def bound(*args, **kwargs):
+            self._current.rerun = rerun
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._current.rerun = None
+        return bound
+
+    def record(self, table, operation, seconds, nbytes=0, error=False):
+        key = (table or "-", operation or "-")
+        rerun = getattr(self._current, "rerun", None)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = OperationStats()
+            stats.observe(seconds, nbytes, error)
+            if rerun is not None:
+                rerun.calls += 1
+                rerun.total_seconds += seconds
+                rerun.bytes += nbytes
+                rerun.by_table[key[0]] = rerun.by_table.get(key[0], 0) + 1
+
+    @contextmanager
+    def timed(self, table, operation):
+        """Time a block; set ``info["bytes"]`` inside it to record payload size"""
+        info = {"bytes": 0}
+        started = time.perf_counter()
+        error = False
+        try:
+            yield info
+        except Exception:
+            error = True
+            raise
+        finally:
+            self.record(table, operation, time.perf_counter() - started, info["bytes"], error)
+
+    def current_rerun(self):
+        rerun = getattr(self._current, "rerun", None)
+        return rerun.summary() if rerun is not None else None
+
+    def snapshot(self):
+        with self._lock:
+            operations = [
+                {"table": table, "operation": operation, **stats.summary()}
+                for (table, operation), stats in sorted(self._stats.items())
+            ]
+            reruns = [rerun.summary() for rerun in reversed(self._reruns)]
+        return {"operations": operations, "reruns": reruns}
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self):
+        """Prometheus text exposition format"""
+        def labels(table, operation, extra=""):
+            return f'table="{table}",operation="{operation}"{extra}'
+
+        lines = [
+            "# HELP poppy_call_duration_seconds Duration of instrumented calls.",
+            "# TYPE poppy_call_duration_seconds histogram",
+        ]
+        with self._lock:
+            items = sorted(self._stats.items())
+            for (table, operation), stats in items:
+                cumulative = 0
+                for bound, count in zip(BUCKETS + ("+Inf",), stats.buckets):
+                    cumulative += count
+                    le = f',le="{bound}"'
+                    lines.append(f"poppy_call_duration_seconds_bucket{{{labels(table, operation, le)}}} {cumulative}")
+                lines.append(f"poppy_call_duration_seconds_sum{{{labels(table, operation)}}} {stats.total_seconds}")
+                lines.append(f"poppy_call_duration_seconds_count{{{labels(table, operation)}}} {stats.count}")
+            lines.append("# HELP poppy_call_bytes_total Response bytes transferred.")
+            lines.append("# TYPE poppy_call_bytes_total counter")
+            for (table, operation), stats in items:
+                lines.append(f"poppy_call_bytes_total{{{labels(table, operation)}}} {stats.bytes}")
+            lines.append("# HELP poppy_call_errors_total Instrumented calls that raised.")
+            lines.append("# TYPE poppy_call_errors_total counter")
+            for (table, operation), stats in items:
+                lines.append(f"poppy_call_errors_total{{{labels(table, operation)}}} {stats.errors}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._reruns.clear()
+
+
+query_metrics = QueryMetrics()
+begin_rerun = query_metrics.begin_rerun
+timed = query_metrics.timed
@@ -0,0 +1,279 @@
+"""One middleware pipeline around Supabase query execution.
+
+``install(client, pipeline)`` routes every ``execute`` of the client's query
+builders (table queries and RPCs) through ``pipeline``, a list of hooks
+called once per query with a ``QueryEvent``. The builder classes are patched
+once per process; per call the cost is a dict lookup and one event, and
+nothing is formatted unless a hook or a viewer asks for it.
+
+The default hooks time the query into ``query_metrics``, match errors
+against ``KNOWN_ISSUES`` (one precompiled pattern) and write the integration
+log with lazily rendered details.
+"""
+import json
+import re
+import threading
+import time
+import weakref
+from functools import partial
+
+from .integration_log import JSONL_PATH, log_event
+from .query_metrics import query_metrics
+
+# Rows of a response kept for the log line; the rest is never stringified
+PREVIEW_ROWS = 3
+
+# Known error patterns and fixes (matched case-insensitively against error messages)
+KNOWN_ISSUES = [
+    {
+        'pattern': 'column reference "id" is ambiguous',
+        'suggestion': 'Use fully qualified column names, e.g., idea_embeddings.id',
+        'autofix': False  # Set to True if you want to try auto-patching
+    },
+    {
+        'pattern': 'Could not find the',
+        'suggestion': 'Check if the column exists in your schema and matches your code.',
+        'autofix': False
+    },
+]
+
+
+class IssueMatcher:
+    """All known-issue patterns compiled into one case-insensitive alternation"""
+
+    def __init__(self, issues):
+        self.issues = list(issues)
+        self._pattern = re.compile(
+            "|".join(f"(?P<issue{i}>{re.escape(issue['pattern'])})" for i, issue in enumerate(self.issues)),
+            re.IGNORECASE,
+        ) if self.issues else None
+
+    def match(self, message):
+        """The first matching issue dict, or None"""
+        if self._pattern is None or not message:
+            return None
+        found = self._pattern.search(message)
+        return self.issues[int(found.lastgroup[len("issue"):])] if found else None
+
+    def suggestion(self, message):
+        issue = self.match(message)
+        return issue['suggestion'] if issue else None
+
+
+known_issues = IssueMatcher(KNOWN_ISSUES)
+
+
+class QueryEvent:
+    """One executed query, as seen by the hooks"""
+    __slots__ = ("pipeline", "table", "operation", "builder", "summarize", "elapsed", "result", "error", "response",
+                 "suggestion")
+
+    def __init__(self, pipeline, table, operation, builder, summarize, elapsed, result, error, response):
+        self.pipeline = pipeline
+        self.table = table
+        self.operation = operation
+        self.builder = builder
+        self.summarize = summarize
+        self.elapsed = elapsed
+        self.result = result
+        self.error = error
+        # Last httpx response for this query, if the client is httpx-backed
+        self.response = response
+        self.suggestion = None
+
+    @property
+    def data(self):
+        return getattr(self.result, "data", self.result)
+
+    @property
+    def row_count(self):
+        data = self.data
+        return len(data) if isinstance(data, list) else (0 if data is None else 1)
+
+    @property
+    def nbytes(self):
+        """Bytes received for the response body (0 when unknown)"""
+        if self.response is None:
+            return 0
+        # Bodies that were never streamed (e.g. built in memory) report 0 downloaded
+        return self.response.num_bytes_downloaded or len(self.response.content)
+
+    def summary(self):
+        """Small, unformatted description of the request (see ``register_builder``)"""
+        return self.summarize(self.builder)
+
+
+class QueryPipeline:
+    """Hooks run, in order, after every query of the clients it is installed on"""
+
+    def __init__(self, hooks=(), name="supabase"):
+        self.hooks = list(hooks)
+        self.name = name
+
+    def add(self, hook):
+        self.hooks.append(hook)
+        return self
+
+    def run(self, builder, describe, summarize, execute, args, kwargs):
+        table, operation = describe(builder)
+        _local.response = None
+        started = time.perf_counter()
+        result = error = None
+        try:
+            result = execute(builder, *args, **kwargs)
+            return result
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            event = QueryEvent(self, table, operation, builder, summarize, time.perf_counter() - started,
+                               result, error, _local.response)
+            _local.response = None
+            for hook in self.hooks:
+                hook(event)
+
+
+# --- Hooks
+def record_timing(event):
+    query_metrics.record(event.table, event.operation, event.elapsed, event.nbytes, error=event.error is not None)
+
+
+def analyze_issues(event):
+    """Attach the known-issue suggestion for a failed query (once, when it happens)"""
+    if event.error is not None:
+        event.suggestion = known_issues.suggestion(str(event.error))
+
+
+def _format_query(name, summary, preview, error):
+    request = " ".join(str(part) for part in summary)
+    if error is not None:
+        return f"{name}: {request} | {error}"
+    return f"{name}: {request} -> {json.dumps(preview, default=str)}"
+
+
+def _format_payload(data):
+    return json.dumps(data, default=str)
+
+
+def log_query(event):
+    """One integration log event per query; the text is rendered only when displayed"""
+    data = event.data
+    preview = data[:PREVIEW_ROWS] if isinstance(data, list) else data
+    details = partial(_format_query, event.pipeline.name, event.summary(), None if event.error else preview, event.error)
+    log_event(
+        'ERROR' if event.error is not None else 'QUERY', details,
+        table=event.table, operation=event.operation,
+        row_count=None if event.error is not None else event.row_count, byte_size=event.nbytes,
+        # The on-disk log gets the full response; only serialised when it is enabled
+        payload=partial(_format_payload, data) if JSONL_PATH and event.error is None else None,
+        suggestion=event.suggestion,
+    )
+
+
+DEFAULT_HOOKS = (record_timing, analyze_issues, log_query)
+
+
+def default_pipeline(name="supabase"):
+    return QueryPipeline(DEFAULT_HOOKS, name)
+
+
+# --- Installation
+_local = threading.local()
+_lock = threading.Lock()
+# builder class -> (owner(builder), describe(builder) -> (table, operation), summarize(builder))
+_adapters = {}
+# owner (e.g. the client's httpx session) -> QueryPipeline
+_pipelines = weakref.WeakKeyDictionary()
+_postgrest_registered = False
+
+
+def register_builder(cls, owner, describe, summarize):
+    """Route ``cls.execute`` through the pipeline installed for ``owner(builder)``.
+
+    ``describe`` returns ``(table, operation)``; ``summarize`` returns a small
+    tuple that is only joined into text when a log line is displayed.
+    """
+    with _lock:
+        if cls in _adapters:
+            return
+        _adapters[cls] = (owner, describe, summarize)
+        original = cls.execute
+
+        def execute(self, *args, **kwargs):
+            pipeline = _pipelines.get(owner(self))
+            if pipeline is None:
+                return original(self, *args, **kwargs)
+            return pipeline.run(self, describe, summarize, original, args, kwargs)
+
+        execute.__doc__ = original.__doc__
+        cls.execute = execute
+
+
+_HTTP_OPERATIONS = {"GET": "select", "HEAD": "select", "POST": "insert", "PATCH": "update", "DELETE": "delete"}
+
+
+def _postgrest_owner(builder):
+    return builder.request.session
+
+
+def _describe_postgrest(builder):
+    request = builder.request
+    if request.path.parent.name == "rpc":
+        return "rpc", request.path.name
+    operation = _HTTP_OPERATIONS.get(request.http_method, request.http_method.lower())
+    if operation == "insert" and "merge-duplicates" in request.headers.get("Prefer", ""):
+        operation = "upsert"
+    return request.path.name, operation
+
+
+def _summarize_postgrest(builder):
+    request = builder.request
+    return request.http_method, request.path.path, request.params
+
+
+def _register_postgrest():
+    global _postgrest_registered
+    if _postgrest_registered:
+        return
+    from postgrest._sync import request_builder
+    for cls in (
+        request_builder.SyncQueryRequestBuilder,
+        request_builder.SyncSingleRequestBuilder,
+        request_builder.SyncMaybeSingleRequestBuilder,
+        request_builder.SyncExplainRequestBuilder,
+    ):
+        register_builder(cls, _postgrest_owner, _describe_postgrest, _summarize_postgrest)
+    _postgrest_registered = True
+
+
+def _remember_response(response):
+    _local.response = response
+
+
+def install(client, pipeline=None):
+    """Run ``client``'s queries through ``pipeline`` (the default hooks if None); reinstalling replaces it"""
+    pipeline = pipeline or default_pipeline()
+    postgrest = getattr(client, "postgrest", None)
+    if postgrest is not None:
+        _register_postgrest()
+        owner = postgrest.session
+        hooks = owner.event_hooks
+        if _remember_response not in hooks["response"]:
+            hooks["response"].append(_remember_response)
+            owner.event_hooks = hooks
+    else:
+        owner = client
+    with _lock:
+        _pipelines[owner] = pipeline
+    return pipeline
+
+
+def uninstall(client):
+    postgrest = getattr(client, "postgrest", None)
+    with _lock:
+        _pipelines.pop(postgrest.session if postgrest is not None else client, None)
+
+
+def instrument(client):
+    """``resources.get_supabase_client(..., instrument=instrument)``: the default pipeline"""
+    install(client)
@@ -0,0 +1,157 @@
+"""Question answering over the idea embeddings (RAG).
+
+``RagService`` ties together the pooled clients from ``resources``, the
+retriever (Supabase vector store, or the in-process index when
+``RETRIEVER=local``) and the semantic answer cache. LangChain and OpenAI are
+only imported when the first question is asked.
+"""
+import os
+import time
+
+from . import resources
+from .answer_cache import answer_cache
+from .embedding_sync import start_background_sync, text_hash
+from .integration_log import log_event
+from .query_metrics import query_metrics, timed
+
+# RETRIEVER=local answers chat retrieval from an in-process NumPy index (vector_index.py)
+RETRIEVER = os.environ.get("RETRIEVER", "supabase")
+LOCAL_INDEX_PATH = os.environ.get("LOCAL_INDEX_PATH", os.path.join(".cache", "idea_index"))
+STREAM_REPAINT_SECONDS = 0.05
+TOP_K = 5
+
+
+def stream_chat(llm, prompt, on_text, repaint_seconds=STREAM_REPAINT_SECONDS):
+    """Stream a chat answer, calling ``on_text(text_so_far, done)`` at most every ``repaint_seconds``.
+
+    Records time-to-first-token and total time. Returns the full answer.
+    """
+    started = time.perf_counter()
+    first_token = None
+    parts = []
+    last_paint = 0.0
+    for chunk in llm.stream(prompt):
+        if not chunk.content:
+            continue
+        now = time.perf_counter()
+        if first_token is None:
+            first_token = now - started
+        parts.append(chunk.content)
+        if now - last_paint >= repaint_seconds:
+            on_text("".join(parts), False)
+            last_paint = now
+    answer = "".join(parts)
+    on_text(answer, True)
+    total = time.perf_counter() - started
+    first_token = total if first_token is None else first_token
+    nbytes = len(answer.encode("utf-8"))
+    query_metrics.record("openai", "chat.first_token", first_token)
+    query_metrics.record("openai", "chat.stream", total, nbytes)
+    log_event('RESPONSE', f"chat.stream: first token {first_token * 1000:.0f} ms, total {total * 1000:.0f} ms",
+              table="openai", operation="chat.stream", byte_size=nbytes)
+    return answer
+
+
+class RagService:
+    """Answers questions about the ideas in one Supabase project"""
+
+    def __init__(self, supabase_url, supabase_key, openai_api_key, retriever=RETRIEVER,
+                 local_index_path=LOCAL_INDEX_PATH, instrument=None, cache=answer_cache):
+        self.supabase_url = supabase_url
+        self.supabase_key = supabase_key
+        self.openai_api_key = openai_api_key
+        self.retriever = retriever
+        self.local_index_path = local_index_path
+        self.instrument = instrument
+        self.cache = cache
+
+    @property
+    def client(self):
+        return resources.get_supabase_client(self.supabase_url, self.supabase_key, self.instrument)
+
+    def embeddings(self):
+        return resources.get_embeddings(self.openai_api_key)
+
+    def vectorstore(self):
+        return resources.get_vectorstore(self.supabase_url, self.supabase_key, self.openai_api_key, self.instrument)
+
+    def local_index(self):
+        return resources.get_local_index(
+            self.local_index_path, self.supabase_url, self.supabase_key, self.openai_api_key, self.instrument
+        )
+
+    def chat_model(self, temperature=0.2):
+        return resources.get_chat_model(self.openai_api_key, temperature)
+
+    def start_sync(self, interval):
+        """Keep embeddings (and the local index) current in a background thread"""
+        return start_background_sync(
+            self.client, self.embeddings(), interval,
+            index=self.local_index() if self.retriever == "local" else None,
+            on_change=self.cache.invalidate_ideas,
+        )
+
+    def scope(self, filters):
+        """Cached answers are only reused for the same retriever and filters"""
+        if self.retriever == "local":
+            return (self.retriever, filters["category_id"], filters["sprint_id"])
+        return (self.retriever,)
+
+    def current_idea_hashes(self, idea_ids):
+        """Content hashes of ideas as they are now, used to validate cached answers"""
+        if self.retriever == "local":
+            index = self.local_index()
+            texts = {idea_id: index.get_text(idea_id) for idea_id in idea_ids}
+            return {idea_id: text_hash(text) for idea_id, text in texts.items() if text is not None}
+        rows = self.client.table("idea_embeddings").select("embedding_id", "content_hash")\
+            .in_("embedding_id", idea_ids).execute().data or []
+        return {str(row["embedding_id"]): row["content_hash"] for row in rows}
+
+    def build_prompt(self, query, query_vector, filters):
+        """Retrieve the top relevant ideas and compose the LLM prompt.
+
+        Returns (prompt, {idea_id: content_hash}) for the retrieved ideas.
+        """
+        if self.retriever == "local":
+            retriever = self.local_index()
+            search_kwargs = {"filter": {"category_id": filters["category_id"], "sprint_id": filters["sprint_id"]}}
+        else:
+            retriever = self.vectorstore()
+            search_kwargs = {}
+        log_event('QUERY', f"{self.retriever} similarity_search: {query}", table="idea_embeddings", operation="similarity_search")
+        with timed("idea_embeddings", f"similarity_search.{self.retriever}"):
+            docs = retriever.similarity_search_by_vector(query_vector, k=TOP_K, **search_kwargs)
+        # A document without an id stays None, so AnswerCache.store refuses an answer it could never invalidate
+        idea_hashes = {
+            None if doc.metadata.get("id") is None else str(doc.metadata["id"]): text_hash(doc.page_content)
+            for doc in docs
+        }
+        context = "\n".join(doc.page_content for doc in docs)
+        prompt = f"""
+    You are an expert product manager. Given the following ideas:
+    {context}
+    Answer the user's question: {query}
+    """
+        return prompt, idea_hashes
+
+    def answer(self, query, filters, on_text=None):
+        """Answer a question, reusing a cached answer when possible.
+
+        Streams through ``on_text(text_so_far, done)`` when given. Returns (answer, cached).
+        """
+        query_vector = self.embeddings().embed_query(query)
+        scope = self.scope(filters)
+        cached_answer = self.cache.lookup(query_vector, scope, self.current_idea_hashes)
+        if cached_answer is not None:
+            log_event('RESPONSE', f"answer cache hit: {query}", table="answer_cache", operation="lookup")
+            return cached_answer, True
+        prompt, idea_hashes = self.build_prompt(query, query_vector, filters)
+        llm = self.chat_model(temperature=0.2)
+        if on_text is not None:
+            answer = stream_chat(llm, prompt, on_text)
+        else:
+            with timed("openai", "chat.invoke") as info:
+                answer = llm.invoke(prompt).content
+                info["bytes"] = len(answer.encode("utf-8"))
+        self.cache.store(query, query_vector, answer, idea_hashes, scope)
+        return answer, False
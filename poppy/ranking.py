@@ -0,0 +1,121 @@
+"""Gap-based ranking for items (higher rank = nearer the top).
+
+Ranks are spaced ``RANK_GAP`` apart, so moving an item between two
+neighbours is a single write of the midpoint. When a gap gets too small the
+table is renumbered by the ``rebalance_item_ranks`` RPC
+(20250604_gap_based_item_ranks.sql) in a background thread.
+"""
+import threading
+
+from .integration_log import log_event
+
+RANK_GAP = 1 << 16
+MIN_GAP = 2  # rebalance once neighbours are closer than this
+# Top/bottom moves push ranks outwards one gap at a time; rebalance well before
+# they stop being exact as float64 (pandas rank columns with NULLs)
+MAX_RANK = 1 << 52
+
+_rebalance_lock = threading.Lock()
+_rebalance_thread = None
+
+
+def rank_between(above_rank=None, below_rank=None):
+    """Rank strictly between two neighbours, or None if there is no room.
+
+    ``above_rank`` is the item that should end up above (higher rank);
+    either side may be None for the top or bottom of the list.
+    """
+    if above_rank is None and below_rank is None:
+        return RANK_GAP
+    if above_rank is None:
+        return below_rank + RANK_GAP
+    if below_rank is None:
+        return above_rank - RANK_GAP
+    if above_rank - below_rank < MIN_GAP:
+        return None
+    return (above_rank + below_rank) // 2
+
+
+def ranks_above(top_rank, count):
+    """``count`` descending ranks above ``top_rank``, for moving items to the top"""
+    base = RANK_GAP if top_rank is None else top_rank + RANK_GAP
+    return [base + RANK_GAP * (count - 1 - i) for i in range(count)]
+
+
+def ranks_below(bottom_rank, count):
+    """``count`` descending ranks below ``bottom_rank``, for moving items to the bottom"""
+    base = 0 if bottom_rank is None else bottom_rank
+    return [base - RANK_GAP * (i + 1) for i in range(count)]
+
+
+def ranks_drifted(ranks):
+    """Whether top/bottom moves have pushed any of ``ranks`` past ``MAX_RANK``"""
+    return any(abs(rank) > MAX_RANK for rank in ranks)
+
+
+def move_neighbours(rows, index, up=True):
+    """(above, below) rows to place ``rows[index]`` between when moving it one place.
+
+    ``rows`` are {"id", "rank"} dicts in display order (rank desc); None on
+    one side means the top or bottom of ``rows``. Returns None if the item
+    is already first (``up``) or last.
+    """
+    target = index - 1 if up else index + 1
+    if not 0 <= target < len(rows):
+        return None
+    if up:
+        return (rows[target - 1] if target > 0 else None), rows[target]
+    return rows[target], (rows[target + 1] if target + 1 < len(rows) else None)
+
+
+def needs_rebalance(above_rank, below_rank):
+    return above_rank is not None and below_rank is not None and above_rank - below_rank < 2 * MIN_GAP
+
+
+def rebalance_ranks(client, gap=RANK_GAP):
+    """Renumber every item ``gap`` apart in one server-side statement"""
+    return client.rpc("rebalance_item_ranks", {"gap": gap}).execute().data
+
+
+def schedule_rebalance(client, gap=RANK_GAP):
+    """Run rebalance_ranks in a background thread unless one is already running"""
+    global _rebalance_thread
+    with _rebalance_lock:
+        if _rebalance_thread is not None and _rebalance_thread.is_alive():
+            return _rebalance_thread
+
+        def run():
+            try:
+                rebalance_ranks(client, gap)
+            except Exception as e:
+                log_event('ERROR', f"Rank rebalance failed: {e}", table="items", operation="rebalance")
+
+        _rebalance_thread = threading.Thread(target=run, name="rank-rebalance", daemon=True)
+        _rebalance_thread.start()
+        return _rebalance_thread
+
+
+def _current_ranks(client, ids):
+    rows = client.table("items").select("id", "rank").in_("id", ids).execute().data or []
+    return {str(row["id"]): row["rank"] for row in rows}
+
+
+def move_item(client, item_id, above=None, below=None):
+    """Place an item between two neighbour rows ({"id", "rank"}) with one write.
+
+    If the neighbours have no room left the table is rebalanced first and
+    their ranks re-read; if the gap is merely getting small a rebalance is
+    scheduled in the background. Returns the new rank.
+    """
+    above_rank = above["rank"] if above else None
+    below_rank = below["rank"] if below else None
+    new_rank = rank_between(above_rank, below_rank)
+    if new_rank is None:
+        rebalance_ranks(client)
+        ranks = _current_ranks(client, [str(row["id"]) for row in (above, below)])
+        above_rank, below_rank = ranks.get(str(above["id"])), ranks.get(str(below["id"]))
+        new_rank = rank_between(above_rank, below_rank)
+    client.table("items").update({"rank": new_rank}).eq("id", item_id).execute()
+    if needs_rebalance(above_rank, new_rank) or needs_rebalance(new_rank, below_rank):
+        schedule_rebalance(client)
+    return new_rank
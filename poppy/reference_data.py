@@ -0,0 +1,133 @@
+"""Process-wide TTL cache for small lookup tables.
+
+Categories, sprints, statuses, priorities and tags are loaded once and kept
+as name->id and id->row dicts until their TTL expires or a write calls
+``invalidate``; the change feed patches single rows with ``apply_change``.
+The cache is shared by all sessions in the process.
+"""
+import os
+import threading
+import time
+
+DEFAULT_TTL = float(os.environ.get("REFERENCE_DATA_TTL", "300"))
+
+# table -> (columns, order column)
+REFERENCE_TABLES = {
+    "categories": (("id", "name"), "name"),
+    "sprints": (("id", "name", "start_date", "end_date", "status", "goal"), "start_date"),
+    "statuses": (("id", "name", "display_order"), "display_order"),
+    "priorities": (("id", "name", "display_order"), "display_order"),
+    "tags": (("id", "name"), "name"),
+}
+
+
+class LookupTable:
+    """Rows of one lookup table with name and id indexes"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.by_id = {row["id"]: row for row in rows}
+        self.by_name = {row["name"]: row["id"] for row in rows}
+        self.loaded_at = time.time()
+
+    def names(self):
+        return [row["name"] for row in self.rows]
+
+    def id_for(self, name):
+        return self.by_name.get(name)
+
+    def row_for(self, row_id):
+        return self.by_id.get(row_id)
+
+
+class ReferenceData:
+    def __init__(self, ttl=DEFAULT_TTL, tables=REFERENCE_TABLES):
+        self.ttl = ttl
+        self.tables = dict(tables)
+        self._cache = {}
+        self._lock = threading.Lock()
+        # One loader per table at a time; concurrent callers wait for it
+        self._load_locks = {table: threading.Lock() for table in self.tables}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.patches = 0
+
+    def _fresh(self, table):
+        entry = self._cache.get(table)
+        if entry is None or time.time() - entry.loaded_at > self.ttl:
+            return None
+        return entry
+
+    def get(self, client, table):
+        """LookupTable for ``table``, loading it if missing or expired"""
+        with self._lock:
+            entry = self._fresh(table)
+            if entry is not None:
+                self.hits += 1
+                return entry
+        with self._load_locks[table]:
+            with self._lock:
+                entry = self._fresh(table)
+                if entry is not None:
+                    self.hits += 1
+                    return entry
+                self.misses += 1
+            entry = self.load(client, table)
+            with self._lock:
+                self._cache[table] = entry
+            return entry
+
+    def load(self, client, table):
+        columns, order = self.tables[table]
+        rows = client.table(table).select(*columns).order(order).execute().data or []
+        return LookupTable(rows)
+
+    def put(self, table, rows):
+        """Seed a table from rows fetched elsewhere (e.g. a prefetch)"""
+        with self._lock:
+            self._cache[table] = LookupTable(rows)
+
+    def apply_change(self, table, change_type, record=None, old_record=None):
+        """Patch a cached table with one changed row (from the change feed) instead of reloading it"""
+        if table not in self.tables:
+            return
+        columns, order = self.tables[table]
+        row_id = (record or old_record or {}).get("id")
+        with self._lock:
+            entry = self._cache.get(table)
+            if entry is None:
+                return
+            rows = [row for row in entry.rows if str(row["id"]) != str(row_id)]
+            if change_type != "DELETE" and record:
+                rows.append({column: record.get(column) for column in columns})
+            # Same order as the load query (ascending, NULLs last)
+            rows.sort(key=lambda row: (row.get(order) is None, row.get(order)))
+            patched = LookupTable(rows)
+            patched.loaded_at = entry.loaded_at
+            self._cache[table] = patched
+            self.patches += 1
+
+    def invalidate(self, *tables):
+        """Drop cached tables; no arguments drops everything"""
+        with self._lock:
+            for table in tables or list(self._cache):
+                self._cache.pop(table, None)
+            self.invalidations += 1
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "patches": self.patches,
+                "ttl": self.ttl,
+                "age": {table: now - entry.loaded_at for table, entry in self._cache.items()},
+            }
+
+
+reference_data = ReferenceData()
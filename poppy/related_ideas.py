@@ -0,0 +1,154 @@
+"""Batch near-duplicate detection that fills ``related_ideas``.
+
+Idea embeddings are loaded into one normalized float32 matrix and compared
+in blocks of ``block_size`` rows, so memory stays at block_size x N scores
+instead of N x N. Pairs at or above ``threshold`` cosine similarity are
+written as ``relationship_type='similar'`` rows with bulk upserts.
+
+In incremental mode only ideas whose content hash changed since their last
+comparison (``idea_embeddings.related_ideas_hash``) are compared against the
+whole corpus:
+
+    python -m poppy.related_ideas --incremental
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from .embedding_sync import EMBEDDINGS_TABLE, EMBEDDING_ID_COLUMN, fetch_all
+from .vector_index import parse_vector
+
+RELATED_TABLE = "related_ideas"
+RELATIONSHIP_TYPE = "similar"
+DEFAULT_THRESHOLD = float(os.environ.get("RELATED_IDEAS_THRESHOLD", "0.92"))
+DEFAULT_BLOCK_SIZE = int(os.environ.get("RELATED_IDEAS_BLOCK_SIZE", "256"))
+WRITE_CHUNK = 500
+DELETE_CHUNK = 50
+
+
+def load_embeddings(client):
+    """(ids, normalized matrix, {id: (content_hash, related_ideas_hash)})"""
+    rows = fetch_all(client, EMBEDDINGS_TABLE, [EMBEDDING_ID_COLUMN, "embedding", "content_hash", "related_ideas_hash"])
+    ids = [str(row[EMBEDDING_ID_COLUMN]) for row in rows]
+    hashes = {idea_id: (row.get("content_hash"), row.get("related_ideas_hash")) for idea_id, row in zip(ids, rows)}
+    if not rows:
+        return ids, np.zeros((0, 0), dtype=np.float32), hashes
+    matrix = np.stack([parse_vector(row["embedding"]) for row in rows])
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return ids, matrix / norms, hashes
+
+
+def similar_pairs(matrix, threshold=DEFAULT_THRESHOLD, block_size=DEFAULT_BLOCK_SIZE, rows=None):
+    """{(i, j): score} with i < j for every row pair at or above ``threshold``.
+
+    With ``rows`` (indexes of changed ideas) only pairs involving those rows
+    are found; otherwise each block is compared against the rows after it.
+    """
+    n = matrix.shape[0]
+    query_rows = np.arange(n) if rows is None else np.asarray(sorted(rows), dtype=np.int64)
+    pairs = {}
+    for start in range(0, len(query_rows), block_size):
+        block = query_rows[start:start + block_size]
+        # Full runs only need the upper triangle: the block against itself and everything after
+        offset = int(block[0]) if rows is None else 0
+        scores = matrix[block] @ matrix[offset:].T
+        hit_rows, hit_cols = np.nonzero(scores >= threshold)
+        hit_scores = scores[hit_rows, hit_cols]
+        for i, j, score in zip(block[hit_rows].tolist(), (hit_cols + offset).tolist(), hit_scores.tolist()):
+            if i != j:
+                pairs[(min(i, j), max(i, j))] = score
+    return pairs
+
+
+def _pair_key(a, b):
+    return (a, b) if a < b else (b, a)
+
+
+def _delete_pairs(client, pairs):
+    pairs = list(pairs)
+    for i in range(0, len(pairs), DELETE_CHUNK):
+        condition = ",".join(f"and(idea1_id.eq.{a},idea2_id.eq.{b})" for a, b in pairs[i:i + DELETE_CHUNK])
+        # Only 'similar' rows; the RLS delete policy allows no others
+        client.table(RELATED_TABLE).delete().eq("relationship_type", RELATIONSHIP_TYPE).or_(condition).execute()
+
+
+def sync_related_ideas(client, threshold=DEFAULT_THRESHOLD, block_size=DEFAULT_BLOCK_SIZE, incremental=False):
+    """Recompute 'similar' pairs and write the difference. Returns counts and timings."""
+    timings = {}
+    started = time.perf_counter()
+    ids, matrix, hashes = load_embeddings(client)
+    existing = fetch_all(client, RELATED_TABLE, ["idea1_id", "idea2_id", "relationship_type"])
+    timings["load_seconds"] = time.perf_counter() - started
+
+    if incremental:
+        changed = [i for i, idea_id in enumerate(ids) if hashes[idea_id][0] != hashes[idea_id][1]]
+    else:
+        changed = list(range(len(ids)))
+    changed_ids = {ids[i] for i in changed}
+
+    started = time.perf_counter()
+    found = similar_pairs(matrix, threshold, block_size, rows=changed if incremental else None) if changed else {}
+    new_pairs = {_pair_key(ids[i], ids[j]): score for (i, j), score in found.items()}
+    timings["compare_seconds"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    # Pairs with another relationship type were set by hand; leave them alone
+    manual = set()
+    old_similar = set()
+    for row in existing:
+        key = _pair_key(str(row["idea1_id"]), str(row["idea2_id"]))
+        if row.get("relationship_type") == RELATIONSHIP_TYPE:
+            if not incremental or changed_ids.intersection(key):
+                old_similar.add(key)
+        else:
+            manual.add(key)
+    stale = old_similar - set(new_pairs)
+    _delete_pairs(client, stale)
+    rows = [
+        {"idea1_id": a, "idea2_id": b, "relationship_type": RELATIONSHIP_TYPE, "similarity": round(score, 4)}
+        for (a, b), score in new_pairs.items() if (a, b) not in manual
+    ]
+    for i in range(0, len(rows), WRITE_CHUNK):
+        client.table(RELATED_TABLE).upsert(rows[i:i + WRITE_CHUNK], on_conflict="idea1_id,idea2_id").execute()
+    checked = [{"id": ids[i], "hash": hashes[ids[i]][0]} for i in changed if hashes[ids[i]][0]]
+    for i in range(0, len(checked), WRITE_CHUNK):
+        client.rpc("mark_related_ideas_checked", {"updates": checked[i:i + WRITE_CHUNK]}).execute()
+    timings["write_seconds"] = time.perf_counter() - started
+
+    return {
+        "ideas": len(ids),
+        "compared": len(changed),
+        "pairs": len(rows),
+        "deleted": len(stale),
+        **timings,
+        "seconds": sum(timings.values()),
+    }
+
+
+def main():
+    from dotenv import load_dotenv
+    from supabase import create_client
+
+    parser = argparse.ArgumentParser(description="Fill related_ideas with near-duplicate pairs")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE,
+                        help="Rows compared per block (memory ~ block size x ideas x 4 bytes)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only compare ideas that are new or changed since the last run")
+    args = parser.parse_args()
+
+    load_dotenv()
+    client = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"])
+    stats = sync_related_ideas(client, args.threshold, args.block_size, args.incremental)
+    print(
+        f"ideas={stats['ideas']} compared={stats['compared']} pairs={stats['pairs']} "
+        f"deleted={stats['deleted']} load={stats['load_seconds']:.2f}s "
+        f"compare={stats['compare_seconds']:.2f}s write={stats['write_seconds']:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Process-wide registry of shared, thread-safe clients.
+
+Supabase, the vector store, embeddings and the chat model are created once
+per process and handed out to every session, so concurrent users share a
+fixed pool of keep-alive HTTP connections instead of opening new ones per
+interaction. Pool limits are tunable through environment variables.
+"""
+import os
+import threading
+
+import httpx
+
+HTTP_MAX_CONNECTIONS = int(os.environ.get("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE = int(os.environ.get("HTTP_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_TIMEOUT = float(os.environ.get("HTTP_TIMEOUT", "30"))
+
+_lock = threading.RLock()
+_resources = {}
+
+
+def _shared(key, factory):
+    with _lock:
+        resource = _resources.get(key)
+        if resource is None:
+            resource = _resources[key] = factory()
+        return resource
+
+
+def get_http_client(name):
+    """Keep-alive httpx client with bounded pool limits, one per backend name"""
+    def create():
+        return httpx.Client(
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+            timeout=HTTP_TIMEOUT,
+            follow_redirects=True,
+        )
+    return _shared(("http", name), create)
+
+
+def get_supabase_client(url, key, instrument=None):
+    """Shared Supabase client; ``instrument`` (e.g. query_middleware.instrument) runs once on creation"""
+    def create():
+        from supabase import ClientOptions, create_client
+        client = create_client(url, key, ClientOptions(httpx_client=get_http_client("supabase")))
+        if instrument is not None:
+            instrument(client)
+        return client
+    return _shared(("supabase", url, key), create)
+
+
+def get_embeddings(openai_api_key):
+    """Shared OpenAI embeddings behind the on-disk embedding cache"""
+    def create():
+        from langchain_openai import OpenAIEmbeddings
+        from .embedding_cache import CachedEmbeddings, get_embedding_cache
+        embeddings = OpenAIEmbeddings(openai_api_key=openai_api_key, http_client=get_http_client("openai"))
+        return CachedEmbeddings(embeddings, get_embedding_cache())
+    return _shared(("embeddings", openai_api_key), create)
+
+
+def get_vectorstore(supabase_url, supabase_key, openai_api_key, instrument=None):
+    def create():
+        from langchain_community.vectorstores import SupabaseVectorStore
+        return SupabaseVectorStore(
+            client=get_supabase_client(supabase_url, supabase_key, instrument),
+            embedding=get_embeddings(openai_api_key),
+            table_name="idea_embeddings",
+        )
+    return _shared(("vectorstore", supabase_url, supabase_key, openai_api_key), create)
+
+
+def get_local_index(path, supabase_url, supabase_key, openai_api_key, instrument=None):
+    """Shared LocalVectorIndex, memory-mapped from ``path`` or built from Supabase"""
+    def create():
+        from .vector_index import LocalVectorIndex
+        embeddings = get_embeddings(openai_api_key)
+        if os.path.exists(path + ".json"):
+            return LocalVectorIndex.load(path, embeddings=embeddings)
+        index = LocalVectorIndex.from_supabase(get_supabase_client(supabase_url, supabase_key, instrument), embeddings)
+        index.save(path)
+        return index
+    return _shared(("local_index", path), create)
+
+
+def get_chat_model(openai_api_key, temperature=0.2):
+    def create():
+        from langchain_openai import ChatOpenAI
+        return ChatOpenAI(
+            openai_api_key=openai_api_key,
+            temperature=temperature,
+            http_client=get_http_client("openai"),
+        )
+    return _shared(("chat", openai_api_key, temperature), create)
+
+
+def close_all():
+    """Close pooled HTTP connections (for scripts and tests)"""
+    with _lock:
+        for key, resource in list(_resources.items()):
+            if key[0] == "http":
+                resource.close()
+        _resources.clear()
@@ -0,0 +1,33 @@
+"""Sprint points/velocity computed server-side in one round trip.
+
+Backed by the ``get_sprint_metrics`` RPC from
+20250602_add_sprint_metrics.sql, which joins ``sprint_backlog`` with
+``backlog_items`` and aggregates per sprint.
+"""
+
+EMPTY_METRICS = {
+    "total_points": 0,
+    "completed_points": 0,
+    "item_count": 0,
+    "completed_count": 0,
+}
+
+
+def get_sprint_metrics(client, sprint_ids=None):
+    """Return {sprint_id: metrics} for the given sprints (all sprints if None).
+
+    Sprints without backlog items are reported with zeroed metrics.
+    """
+    params = {"sprint_ids": list(sprint_ids) if sprint_ids is not None else None}
+    rows = client.rpc("get_sprint_metrics", params).execute().data or []
+    metrics = {str(sprint_id): dict(EMPTY_METRICS) for sprint_id in sprint_ids or []}
+    for row in rows:
+        metrics[str(row["sprint_id"])] = {key: row[key] or 0 for key in EMPTY_METRICS}
+    return metrics
+
+
+def completion_ratio(metrics):
+    """Share of sprint points already done (0.0 - 1.0)"""
+    if not metrics["total_points"]:
+        return 0.0
+    return metrics["completed_points"] / metrics["total_points"]
@@ -0,0 +1,224 @@
+"""In-process vector index for idea retrieval.
+
+Idea embeddings live in one contiguous, L2-normalized float32 matrix, so a
+top-k query is a single matmul plus ``argpartition``. Rows are keyed by idea
+id with incremental add/remove, and can be filtered by status, category and
+sprint. The index can be saved to disk and memory-mapped back, and exposes
+``similarity_search`` so it can stand in for ``SupabaseVectorStore`` in the
+chat path without a database round trip.
+"""
+import json
+import os
+import threading
+
+import numpy as np
+
+FILTER_FIELDS = ("status", "category_id", "sprint_id")
+_NO_VALUE = -1
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def parse_vector(value):
+    """pgvector columns come back from PostgREST as '[0.1,0.2,...]' strings"""
+    if isinstance(value, str):
+        value = json.loads(value)
+    return np.asarray(value, dtype=np.float32)
+
+
+class LocalVectorIndex:
+    def __init__(self, dim=None, capacity=1024, embeddings=None):
+        self.dim = dim
+        self.embeddings = embeddings
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32) if dim else None
+        self._ids = []
+        self._rows = {}
+        self._texts = []
+        # Metadata values are interned to int codes so filters are vectorized compares
+        self._codes = {field: np.full(capacity, _NO_VALUE, dtype=np.int32) for field in FILTER_FIELDS}
+        self._vocab = {field: {} for field in FILTER_FIELDS}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _ensure_capacity(self, needed):
+        """Grow (or copy a read-only memory map) so ``needed`` rows are writable"""
+        if self.dim is None:
+            # Nothing has been added yet, so there are no rows to make room for
+            return
+        if self._vectors is None:
+            self._vectors = np.zeros((0, self.dim), dtype=np.float32)
+        capacity = self._vectors.shape[0]
+        if needed <= capacity and self._vectors.flags.writeable:
+            return
+        new_capacity = max(needed, capacity * 2, 1024)
+        vectors = np.zeros((new_capacity, self.dim), dtype=np.float32)
+        vectors[:len(self._ids)] = self._vectors[:len(self._ids)]
+        self._vectors = vectors
+        for field in FILTER_FIELDS:
+            codes = np.full(new_capacity, _NO_VALUE, dtype=np.int32)
+            codes[:len(self._ids)] = self._codes[field][:len(self._ids)]
+            self._codes[field] = codes
+
+    def _code(self, field, value, create=True):
+        if value is None:
+            return _NO_VALUE
+        vocab = self._vocab[field]
+        code = vocab.get(str(value))
+        if code is None and create:
+            code = vocab[str(value)] = len(vocab)
+        return code
+
+    def _set_metadata(self, row, metadata):
+        for field in FILTER_FIELDS:
+            self._codes[field][row] = self._code(field, metadata.get(field))
+
+    def add(self, ids, vectors, texts=None, metadatas=None):
+        """Insert or replace rows for the given idea ids"""
+        matrix = _normalize(np.asarray(vectors, dtype=np.float32).reshape(len(ids), -1))
+        with self._lock:
+            if self.dim is None:
+                self.dim = matrix.shape[1]
+            self._ensure_capacity(len(self._ids) + len(ids))
+            for i, idea_id in enumerate(ids):
+                idea_id = str(idea_id)
+                row = self._rows.get(idea_id)
+                if row is None:
+                    row = self._rows[idea_id] = len(self._ids)
+                    self._ids.append(idea_id)
+                    self._texts.append("")
+                self._vectors[row] = matrix[i]
+                if texts is not None:
+                    self._texts[row] = texts[i]
+                self._set_metadata(row, metadatas[i] if metadatas is not None else {})
+
+    def get_text(self, idea_id):
+        row = self._rows.get(str(idea_id))
+        return self._texts[row] if row is not None else None
+
+    def update_metadata(self, idea_id, metadata):
+        with self._lock:
+            row = self._rows.get(str(idea_id))
+            if row is not None:
+                self._ensure_capacity(len(self._ids))
+                self._set_metadata(row, metadata)
+
+    def remove(self, ids):
+        """Drop rows by idea id; the last row is moved into each hole"""
+        with self._lock:
+            if not self._ids:
+                return
+            self._ensure_capacity(len(self._ids))
+            for idea_id in ids:
+                row = self._rows.pop(str(idea_id), None)
+                if row is None:
+                    continue
+                last = len(self._ids) - 1
+                if row != last:
+                    moved_id = self._ids[last]
+                    self._vectors[row] = self._vectors[last]
+                    for field in FILTER_FIELDS:
+                        self._codes[field][row] = self._codes[field][last]
+                    self._ids[row] = moved_id
+                    self._texts[row] = self._texts[last]
+                    self._rows[moved_id] = row
+                self._ids.pop()
+                self._texts.pop()
+
+    def _filter_mask(self, n, filter):
+        mask = np.ones(n, dtype=bool)
+        for field, value in (filter or {}).items():
+            if field not in self._codes or value is None:
+                continue
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            codes = [self._code(field, v, create=False) for v in values]
+            codes = [code for code in codes if code is not None]
+            mask &= np.isin(self._codes[field][:n], codes)
+        return mask
+
+    def search(self, query_vector, k=5, filter=None):
+        """Top-k [(idea_id, score, text)] by cosine similarity"""
+        query = np.asarray(query_vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        with self._lock:
+            n = len(self._ids)
+            if n == 0:
+                return []
+            scores = self._vectors[:n] @ query
+            if filter:
+                scores = np.where(self._filter_mask(n, filter), scores, -np.inf)
+            k = min(k, n)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [
+                (self._ids[row], float(scores[row]), self._texts[row])
+                for row in top if np.isfinite(scores[row])
+            ]
+
+    def similarity_search_by_vector(self, embedding, k=4, filter=None, **kwargs):
+        from langchain_core.documents import Document
+        return [
+            Document(page_content=text, metadata={"id": idea_id, "similarity": score})
+            for idea_id, score, text in self.search(embedding, k, filter)
+        ]
+
+    def similarity_search(self, query, k=4, filter=None, **kwargs):
+        """Drop-in for VectorStore.similarity_search (needs ``embeddings``)"""
+        return self.similarity_search_by_vector(self.embeddings.embed_query(query), k, filter)
+
+    def save(self, path):
+        """Write ``path.npy`` (vectors) and ``path.json`` (ids, texts, metadata codes)"""
+        with self._lock:
+            n = len(self._ids)
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            # An empty index has no dimension yet: a 0-row file with "dim": null
+            vectors = self._vectors[:n] if self._vectors is not None else np.zeros((0, 0), dtype=np.float32)
+            np.save(path + ".npy", np.ascontiguousarray(vectors))
+            with open(path + ".json", "w", encoding="utf-8") as f:
+                json.dump({
+                    "dim": self.dim,
+                    "ids": self._ids,
+                    "texts": self._texts,
+                    "vocab": self._vocab,
+                    "codes": {field: self._codes[field][:n].tolist() for field in FILTER_FIELDS},
+                }, f)
+
+    @classmethod
+    def load(cls, path, mmap=True, embeddings=None):
+        """Load a saved index; vectors are memory-mapped read-only until first write"""
+        with open(path + ".json", encoding="utf-8") as f:
+            meta = json.load(f)
+        index = cls(dim=meta["dim"], capacity=1, embeddings=embeddings)
+        if meta["dim"] is not None:
+            index._vectors = np.load(path + ".npy", mmap_mode="r" if mmap else None)
+        index._ids = meta["ids"]
+        index._texts = meta["texts"]
+        index._rows = {idea_id: row for row, idea_id in enumerate(index._ids)}
+        index._vocab = meta["vocab"]
+        index._codes = {field: np.asarray(meta["codes"][field], dtype=np.int32) for field in FILTER_FIELDS}
+        return index
+
+    @classmethod
+    def from_supabase(cls, client, embeddings=None):
+        """Build from the idea_embeddings table plus item status/category/sprint"""
+        from .embedding_sync import EMBEDDINGS_TABLE, EMBEDDING_ID_COLUMN, fetch_all
+        rows = fetch_all(client, EMBEDDINGS_TABLE, [EMBEDDING_ID_COLUMN, "content", "embedding"])
+        items = fetch_all(client, "items", ["id", *FILTER_FIELDS])
+        metadata = {str(item["id"]): item for item in items}
+        index = cls(embeddings=embeddings)
+        if rows:
+            ids = [str(row[EMBEDDING_ID_COLUMN]) for row in rows]
+            index.add(
+                ids,
+                np.stack([parse_vector(row["embedding"]) for row in rows]),
+                texts=[row["content"] for row in rows],
+                metadatas=[metadata.get(idea_id, {}) for idea_id in ids],
+            )
+        return index
@@ -0,0 +1,4 @@
+-- Track what each vector was built from so the sync job only re-embeds changed ideas
+ALTER TABLE idea_embeddings
+ADD COLUMN IF NOT EXISTS content_hash TEXT,
+ADD COLUMN IF NOT EXISTS embedding_model TEXT;
@@ -0,0 +1,25 @@
+-- Aggregate sprint points, completed points and item counts in a single call.
+-- Pass NULL to get metrics for every sprint that has backlog items.
+CREATE OR REPLACE FUNCTION get_sprint_metrics(sprint_ids UUID[] DEFAULT NULL)
+RETURNS TABLE (
+    sprint_id UUID,
+    total_points BIGINT,
+    completed_points BIGINT,
+    item_count BIGINT,
+    completed_count BIGINT
+) AS $$
+BEGIN
+    RETURN QUERY
+    SELECT
+        sb.sprint_id,
+        COALESCE(SUM(bi.points), 0)::BIGINT,
+        COALESCE(SUM(bi.points) FILTER (WHERE sb.status = 'done'), 0)::BIGINT,
+        COUNT(*)::BIGINT,
+        COUNT(*) FILTER (WHERE sb.status = 'done')::BIGINT
+    FROM sprint_backlog sb
+    JOIN backlog_items bi ON bi.id = sb.backlog_item_id
+    WHERE get_sprint_metrics.sprint_ids IS NULL
+       OR sb.sprint_id = ANY(get_sprint_metrics.sprint_ids)
+    GROUP BY sb.sprint_id;
+END;
+$$ LANGUAGE plpgsql STABLE;
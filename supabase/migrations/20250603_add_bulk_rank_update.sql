@@ -0,0 +1,15 @@
+-- Apply many rank changes in one statement.
+-- updates: JSON array of {"id": <uuid>, "rank": <int>}; returns the number of rows updated.
+CREATE OR REPLACE FUNCTION update_item_ranks(updates JSONB)
+RETURNS INTEGER AS $$
+DECLARE
+    updated_count INTEGER;
+BEGIN
+    UPDATE items AS i
+    SET rank = (u.value->>'rank')::INTEGER
+    FROM jsonb_array_elements(updates) AS u
+    WHERE i.id = (u.value->>'id')::UUID;
+    GET DIAGNOSTICS updated_count = ROW_COUNT;
+    RETURN updated_count;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,45 @@
+-- Gap-based ranking: ranks are spaced RANK_GAP apart so an item can be placed
+-- between two neighbours with a single write (see ranking.py).
+ALTER TABLE items ALTER COLUMN rank TYPE BIGINT;
+
+-- Renumber all items RANK_GAP apart, keeping the current order.
+-- Called lazily by ranking.py when the gap between two neighbours runs out.
+CREATE OR REPLACE FUNCTION rebalance_item_ranks(gap BIGINT DEFAULT 65536)
+RETURNS INTEGER AS $$
+DECLARE
+    updated_count INTEGER;
+BEGIN
+    UPDATE items AS i
+    SET rank = r.new_rank
+    FROM (
+        SELECT items.id, ROW_NUMBER() OVER (ORDER BY items.rank ASC NULLS FIRST, items.id ASC) * gap AS new_rank
+        FROM items
+    ) AS r
+    WHERE i.id = r.id
+      AND i.rank IS DISTINCT FROM r.new_rank;
+    GET DIAGNOSTICS updated_count = ROW_COUNT;
+    RETURN updated_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Ranks are now BIGINT
+CREATE OR REPLACE FUNCTION update_item_ranks(updates JSONB)
+RETURNS INTEGER AS $$
+DECLARE
+    updated_count INTEGER;
+BEGIN
+    UPDATE items AS i
+    SET rank = (u.value->>'rank')::BIGINT
+    FROM jsonb_array_elements(updates) AS u
+    WHERE i.id = (u.value->>'id')::UUID;
+    GET DIAGNOSTICS updated_count = ROW_COUNT;
+    RETURN updated_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Spread existing ranks out
+SELECT rebalance_item_ranks();
+
+-- Keep the ordered fetches index scans
+CREATE INDEX IF NOT EXISTS idx_items_rank ON items (rank DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_items_status_rank ON items (status, rank DESC, id DESC);
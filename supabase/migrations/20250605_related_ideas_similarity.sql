@@ -0,0 +1,29 @@
+-- Near-duplicate pairs are computed from idea_embeddings, which are keyed by items.id
+ALTER TABLE related_ideas DROP CONSTRAINT IF EXISTS related_ideas_idea1_id_fkey;
+ALTER TABLE related_ideas DROP CONSTRAINT IF EXISTS related_ideas_idea2_id_fkey;
+ALTER TABLE related_ideas
+    ADD CONSTRAINT related_ideas_idea1_id_fkey FOREIGN KEY (idea1_id) REFERENCES items(id) ON DELETE CASCADE,
+    ADD CONSTRAINT related_ideas_idea2_id_fkey FOREIGN KEY (idea2_id) REFERENCES items(id) ON DELETE CASCADE;
+
+-- Cosine similarity for relationship_type = 'similar' rows
+ALTER TABLE related_ideas ADD COLUMN IF NOT EXISTS similarity REAL;
+CREATE INDEX IF NOT EXISTS idx_related_ideas_idea2 ON related_ideas (idea2_id);
+
+-- content_hash of each embedding when its pairs were last computed (see related_ideas.py)
+ALTER TABLE idea_embeddings ADD COLUMN IF NOT EXISTS related_ideas_hash TEXT;
+
+-- Record the content hashes the duplicate job has compared.
+-- updates: JSON array of {"id": <uuid>, "hash": <text>}; returns the number of rows updated.
+CREATE OR REPLACE FUNCTION mark_related_ideas_checked(updates JSONB)
+RETURNS INTEGER AS $$
+DECLARE
+    updated_count INTEGER;
+BEGIN
+    UPDATE idea_embeddings AS e
+    SET related_ideas_hash = u.value->>'hash'
+    FROM jsonb_array_elements(updates) AS u
+    WHERE e.embedding_id::TEXT = u.value->>'id';
+    GET DIAGNOSTICS updated_count = ROW_COUNT;
+    RETURN updated_count;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,79 @@
+-- Change feed (poppy/change_feed.py) for items, sprints, categories and sprint_backlog
+
+-- Polling fallback: every watched row carries updated_at, maintained by trigger_set_timestamp()
+ALTER TABLE items ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP;
+ALTER TABLE categories ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP;
+ALTER TABLE sprint_backlog ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP;
+
+DROP TRIGGER IF EXISTS set_items_updated_at ON items;
+CREATE TRIGGER set_items_updated_at
+BEFORE UPDATE ON items
+FOR EACH ROW EXECUTE FUNCTION public.trigger_set_timestamp();
+
+DROP TRIGGER IF EXISTS set_categories_updated_at ON categories;
+CREATE TRIGGER set_categories_updated_at
+BEFORE UPDATE ON categories
+FOR EACH ROW EXECUTE FUNCTION public.trigger_set_timestamp();
+
+DROP TRIGGER IF EXISTS set_sprint_backlog_updated_at ON sprint_backlog;
+CREATE TRIGGER set_sprint_backlog_updated_at
+BEFORE UPDATE ON sprint_backlog
+FOR EACH ROW EXECUTE FUNCTION public.trigger_set_timestamp();
+
+CREATE INDEX IF NOT EXISTS idx_items_updated_at ON items (updated_at);
+CREATE INDEX IF NOT EXISTS idx_sprints_updated_at ON sprints (updated_at);
+CREATE INDEX IF NOT EXISTS idx_categories_updated_at ON categories (updated_at);
+CREATE INDEX IF NOT EXISTS idx_sprint_backlog_updated_at ON sprint_backlog (updated_at);
+
+-- Deleted rows leave nothing to poll; keep their last version here.
+-- Old rows can be pruned, e.g. DELETE FROM row_tombstones WHERE deleted_at < NOW() - INTERVAL '1 day'.
+CREATE TABLE IF NOT EXISTS row_tombstones (
+    id BIGSERIAL PRIMARY KEY,
+    table_name TEXT NOT NULL,
+    old_record JSONB NOT NULL,
+    deleted_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE OR REPLACE FUNCTION record_row_tombstone()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO row_tombstones (table_name, old_record) VALUES (TG_TABLE_NAME, to_jsonb(OLD));
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS items_row_tombstone ON items;
+CREATE TRIGGER items_row_tombstone AFTER DELETE ON items
+FOR EACH ROW EXECUTE FUNCTION record_row_tombstone();
+
+DROP TRIGGER IF EXISTS sprints_row_tombstone ON sprints;
+CREATE TRIGGER sprints_row_tombstone AFTER DELETE ON sprints
+FOR EACH ROW EXECUTE FUNCTION record_row_tombstone();
+
+DROP TRIGGER IF EXISTS categories_row_tombstone ON categories;
+CREATE TRIGGER categories_row_tombstone AFTER DELETE ON categories
+FOR EACH ROW EXECUTE FUNCTION record_row_tombstone();
+
+DROP TRIGGER IF EXISTS sprint_backlog_row_tombstone ON sprint_backlog;
+CREATE TRIGGER sprint_backlog_row_tombstone AFTER DELETE ON sprint_backlog
+FOR EACH ROW EXECUTE FUNCTION record_row_tombstone();
+
+-- Realtime: send full old rows on UPDATE/DELETE so viewers know which tab a row left
+ALTER TABLE items REPLICA IDENTITY FULL;
+ALTER TABLE sprints REPLICA IDENTITY FULL;
+ALTER TABLE categories REPLICA IDENTITY FULL;
+ALTER TABLE sprint_backlog REPLICA IDENTITY FULL;
+
+DO $$
+DECLARE
+    watched TEXT;
+BEGIN
+    FOREACH watched IN ARRAY ARRAY['items', 'sprints', 'categories', 'sprint_backlog'] LOOP
+        BEGIN
+            EXECUTE format('ALTER PUBLICATION supabase_realtime ADD TABLE %I', watched);
+        EXCEPTION WHEN duplicate_object THEN
+            NULL;
+        END;
+    END LOOP;
+END;
+$$;
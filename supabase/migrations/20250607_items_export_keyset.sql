@@ -0,0 +1,2 @@
+-- Export (poppy/export.py) pages through items by (updated_at, id)
+CREATE INDEX IF NOT EXISTS idx_items_updated_at_id ON items (updated_at, id);
@@ -0,0 +1,20 @@
+-- rebalance_item_ranks numbered NULL ranks first, so every rebalance moved unranked
+-- items from the top of their tab (rank DESC puts NULLs first) to the bottom.
+-- Number rows in exactly the reverse of the display order (rank DESC NULLS FIRST, id DESC).
+CREATE OR REPLACE FUNCTION rebalance_item_ranks(gap BIGINT DEFAULT 65536)
+RETURNS INTEGER AS $$
+DECLARE
+    updated_count INTEGER;
+BEGIN
+    UPDATE items AS i
+    SET rank = r.new_rank
+    FROM (
+        SELECT items.id, ROW_NUMBER() OVER (ORDER BY items.rank ASC NULLS LAST, items.id ASC) * gap AS new_rank
+        FROM items
+    ) AS r
+    WHERE i.id = r.id
+      AND i.rank IS DISTINCT FROM r.new_rank;
+    GET DIAGNOSTICS updated_count = ROW_COUNT;
+    RETURN updated_count;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,35 @@
+-- related_ideas now references items (20250605_related_ideas_similarity.sql), but its RLS
+-- policies still matched poppy_ideas_v2.creator_id, and there were no UPDATE or DELETE
+-- policies. No items id matches those checks, so the duplicate job (poppy/related_ideas.py,
+-- which uses the app's SUPABASE_KEY) could not write pairs and nobody could read them.
+-- items has no RLS, so related_ideas is readable by the same roles as items. Writes are
+-- limited to pairs of existing items, and update/delete to the job's 'similar' rows, so
+-- pairs with other relationship types stay hand-maintained.
+ALTER TABLE related_ideas ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view related ideas for their ideas" ON related_ideas;
+DROP POLICY IF EXISTS "Users can create related ideas for their ideas" ON related_ideas;
+
+CREATE POLICY "Related ideas are readable like items" ON related_ideas
+    FOR SELECT TO anon, authenticated
+    USING (true);
+
+CREATE POLICY "Related ideas link existing items" ON related_ideas
+    FOR INSERT TO anon, authenticated
+    WITH CHECK (
+        EXISTS (SELECT 1 FROM items WHERE items.id = related_ideas.idea1_id)
+        AND EXISTS (SELECT 1 FROM items WHERE items.id = related_ideas.idea2_id)
+    );
+
+CREATE POLICY "Duplicate job updates similar pairs" ON related_ideas
+    FOR UPDATE TO anon, authenticated
+    USING (relationship_type = 'similar')
+    WITH CHECK (
+        relationship_type = 'similar'
+        AND EXISTS (SELECT 1 FROM items WHERE items.id = related_ideas.idea1_id)
+        AND EXISTS (SELECT 1 FROM items WHERE items.id = related_ideas.idea2_id)
+    );
+
+CREATE POLICY "Duplicate job deletes similar pairs" ON related_ideas
+    FOR DELETE TO anon, authenticated
+    USING (relationship_type = 'similar');
@@ -0,0 +1,51 @@
+-- row_tombstones (20250606_change_feed.sql): readable by the poller's roles only, written only by the trigger,
+-- and holding just the columns the change feed routes deletes by rather than whole deleted rows
+
+ALTER TABLE row_tombstones ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Enable read access for all users" ON row_tombstones;
+CREATE POLICY "Enable read access for all users" ON row_tombstones
+FOR SELECT TO anon, authenticated USING (true);
+-- No insert/update/delete policies: clients cannot forge or erase deletes
+
+-- Keeps the columns named in the trigger arguments (see TOMBSTONE_COLUMNS in poppy/change_feed.py).
+-- SECURITY DEFINER so deletes by any role can write past RLS; search_path is pinned against hijacking.
+CREATE OR REPLACE FUNCTION record_row_tombstone()
+RETURNS TRIGGER
+SECURITY DEFINER
+SET search_path = public, pg_temp
+AS $$
+BEGIN
+    INSERT INTO public.row_tombstones (table_name, old_record)
+    SELECT TG_TABLE_NAME, COALESCE(jsonb_object_agg(key, value), '{}'::jsonb)
+    FROM jsonb_each(to_jsonb(OLD))
+    WHERE key = ANY(TG_ARGV);
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+REVOKE ALL ON FUNCTION record_row_tombstone() FROM PUBLIC;
+
+DROP TRIGGER IF EXISTS items_row_tombstone ON items;
+CREATE TRIGGER items_row_tombstone AFTER DELETE ON items
+FOR EACH ROW EXECUTE FUNCTION record_row_tombstone('id', 'status', 'priority', 'category_id', 'sprint_id');
+
+DROP TRIGGER IF EXISTS sprints_row_tombstone ON sprints;
+CREATE TRIGGER sprints_row_tombstone AFTER DELETE ON sprints
+FOR EACH ROW EXECUTE FUNCTION record_row_tombstone('id');
+
+DROP TRIGGER IF EXISTS categories_row_tombstone ON categories;
+CREATE TRIGGER categories_row_tombstone AFTER DELETE ON categories
+FOR EACH ROW EXECUTE FUNCTION record_row_tombstone('id');
+
+DROP TRIGGER IF EXISTS sprint_backlog_row_tombstone ON sprint_backlog;
+CREATE TRIGGER sprint_backlog_row_tombstone AFTER DELETE ON sprint_backlog
+FOR EACH ROW EXECUTE FUNCTION record_row_tombstone('sprint_id', 'backlog_item_id');
+
+-- Strip the content from tombstones written before this migration
+UPDATE row_tombstones
+SET old_record = (
+    SELECT COALESCE(jsonb_object_agg(key, value), '{}'::jsonb)
+    FROM jsonb_each(row_tombstones.old_record)
+    WHERE key IN ('id', 'status', 'priority', 'category_id', 'sprint_id', 'backlog_item_id')
+);